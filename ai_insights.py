@@ -1,51 +1,194 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
 import google.generativeai as genai
-from typing import List, Dict, Optional
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
 import logging
 from datetime import datetime
 import config
 from stocks import StockAnalyzer
+from portfolio import PortfolioStats, compute_portfolio_stats
 
 logger = logging.getLogger(__name__)
 
+class AIFailure(str):
+    """Message returned in place of an AI answer: shown to the user, but never cached"""
+
+# Prompt-hash -> (expires_at, response text), shared by every AIInsightsManager
+_PROMPT_CACHE: Dict[str, Tuple[float, str]] = {}
+_PROMPT_INFLIGHT: Dict[str, asyncio.Future] = {}
+_PROMPT_CACHE_MAXSIZE = 1024
+
+def prompt_memoize(ttl: int):
+    """Memoize a Gemini call on sha256(model:prompt) for `ttl` seconds.
+
+    Concurrent callers with the same prompt share one in-flight request
+    instead of each paying a full Gemini round-trip.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, prompt: str, *args, **kwargs) -> str:
+            model_name = getattr(self.model, 'model_name', '')
+            key = hashlib.sha256(f"{model_name}:{prompt}".encode('utf-8')).hexdigest()
+            now = time.monotonic()
+
+            cached = _PROMPT_CACHE.get(key)
+            if cached and cached[0] > now:
+                logger.debug(f"Gemini cache hit {key[:12]}")
+                return cached[1]
+
+            inflight = _PROMPT_INFLIGHT.get(key)
+            if inflight:
+                return await asyncio.shield(inflight)
+
+            future = asyncio.get_running_loop().create_future()
+            _PROMPT_INFLIGHT[key] = future
+            try:
+                text = await func(self, prompt, *args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                # Mark retrieved so a fetch without waiters doesn't log a warning
+                future.exception()
+                raise
+            finally:
+                _PROMPT_INFLIGHT.pop(key, None)
+                if not future.done():
+                    # Cancelled (a BaseException, so not caught above): release the waiters
+                    future.cancel()
+
+            future.set_result(text)
+            if text:
+                if len(_PROMPT_CACHE) >= _PROMPT_CACHE_MAXSIZE:
+                    for stale_key in [k for k, (exp, _) in _PROMPT_CACHE.items() if exp <= now]:
+                        del _PROMPT_CACHE[stale_key]
+                    if len(_PROMPT_CACHE) >= _PROMPT_CACHE_MAXSIZE:
+                        del _PROMPT_CACHE[next(iter(_PROMPT_CACHE))]
+                _PROMPT_CACHE[key] = (now + ttl, text)
+            return text
+        return wrapper
+    return decorator
+
+@functools.lru_cache(maxsize=512)
+def _technical_summary_cached(key: Tuple) -> str:
+    """Render the technical summary for a (rounded rsi, *category flags) tuple"""
+    rsi, oversold, overbought, macd_bullish, bb_upper, bb_lower, golden_cross = key
+    summary = []
+    
+    # RSI
+    if oversold:
+        summary.append(f"RSI: {rsi:.1f} (Oversold)")
+    elif overbought:
+        summary.append(f"RSI: {rsi:.1f} (Overbought)")
+    else:
+        summary.append(f"RSI: {rsi:.1f} (Neutral)")
+    
+    # MACD
+    if macd_bullish:
+        summary.append("MACD: Bullish crossover")
+    else:
+        summary.append("MACD: Bearish crossover")
+    
+    # Bollinger Bands
+    if bb_upper:
+        summary.append("Bollinger Bands: Near upper band")
+    elif bb_lower:
+        summary.append("Bollinger Bands: Near lower band")
+    else:
+        summary.append("Bollinger Bands: Middle range")
+    
+    # EMA Crossover
+    if golden_cross:
+        summary.append("EMA: Golden cross (50 > 200)")
+    else:
+        summary.append("EMA: Death cross (50 < 200)")
+    
+    return " | ".join(summary)
+
+@functools.lru_cache(maxsize=512)
+def _news_summary_cached(titles: Tuple[str, ...]) -> str:
+    """Render the headline bullets for a tuple of news titles"""
+    # Only mark titles that were actually cut; a single "…" costs fewer prompt tokens than "..."
+    headlines = [f"• {title[:80]}{'…' if len(title) > 80 else ''}" for title in titles if title]
+    
+    return "\n".join(headlines) if headlines else "No recent news available"
+
+# Tried in order; the first one that initializes wins
+_MODEL_CANDIDATES = ('gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro')
+
+# genai.configure mutates SDK module state, so configure once per process
+_GEMINI_CONFIGURED = False
+_GLOBAL_MODEL = None
+
 class AIInsightsManager:
+    # Shared so every manager reuses one analyzer (HTTP session and price cache)
+    _shared_analyzer: Optional[StockAnalyzer] = None
+
     def __init__(self):
-        self.stock_analyzer = StockAnalyzer()
-        self.setup_gemini()
+        if AIInsightsManager._shared_analyzer is None:
+            AIInsightsManager._shared_analyzer = StockAnalyzer()
+        self.stock_analyzer = AIInsightsManager._shared_analyzer
+        self._model = None
+        self._model_initialized = False
+
+    @property
+    def model(self):
+        """Gemini model, configured lazily on first use"""
+        if not self._model_initialized:
+            self._model = self.setup_gemini()
+            self._model_initialized = True
+        return self._model
 
     def setup_gemini(self):
-        """Configure Gemini AI with updated model name"""
+        """Configure Gemini AI and return the first model candidate that initializes"""
+        global _GEMINI_CONFIGURED, _GLOBAL_MODEL
+        if _GEMINI_CONFIGURED:
+            return _GLOBAL_MODEL
+
         try:
             genai.configure(api_key=config.GEMINI_API_KEY)
-            # Use the new model name - gemini-pro is deprecated
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            logger.info("Successfully configured Gemini AI with gemini-1.5-flash")
         except Exception as e:
             logger.error(f"Failed to setup Gemini AI: {e}")
-            # Try fallback model names
+
+        _GEMINI_CONFIGURED = True
+        for model_name in _MODEL_CANDIDATES:
             try:
-                self.model = genai.GenerativeModel('gemini-1.5-pro')
-                logger.info("Using fallback model: gemini-1.5-pro")
-            except:
-                try:
-                    self.model = genai.GenerativeModel('gemini-pro')
-                    logger.info("Using legacy model: gemini-pro")
-                except:
-                    logger.error("All Gemini models failed")
-                    self.model = None
-
-    def generate_stock_insight(self, symbol: str) -> str:
+                _GLOBAL_MODEL = genai.GenerativeModel(model_name)
+                logger.info(f"Successfully configured Gemini AI with {model_name}")
+                return _GLOBAL_MODEL
+            except Exception as e:
+                logger.warning(f"Gemini model {model_name} unavailable: {e}")
+
+        logger.error("All Gemini models failed")
+        return None
+
+    @prompt_memoize(ttl=config.UPDATE_INTERVAL_MINUTES * 60)
+    async def _generate(self, prompt: str, on_chunk: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        """Stream a Gemini completion, awaiting on_chunk for each chunk, and return the joined text"""
+        parts = []
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            text = chunk.text
+            if text:
+                parts.append(text)
+                if on_chunk:
+                    await on_chunk(text)
+        return "".join(parts).strip()
+
+    async def generate_stock_insight(self, symbol: str, on_chunk: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
         """Generate AI-powered stock insight"""
         if not self.model:
-            return "AI insights unavailable - Gemini not configured"
+            return AIFailure("AI insights unavailable - Gemini not configured")
 
         try:
-            # Get technical indicators
-            indicators = self.stock_analyzer.calculate_technical_indicators(symbol)
+            # Get technical indicators and latest news concurrently
+            indicators, news = await asyncio.gather(
+                asyncio.to_thread(self.stock_analyzer.calculate_technical_indicators, symbol),
+                asyncio.to_thread(self.stock_analyzer.get_stock_news, symbol, limit=3)
+            )
             if not indicators:
-                return f"Unable to generate insights for {symbol} - insufficient data"
-
-            # Get latest news
-            news = self.stock_analyzer.get_stock_news(symbol, limit=3)
+                return AIFailure(f"Unable to generate insights for {symbol} - insufficient data")
             
             # Format technical indicators summary
             tech_summary = self._format_technical_summary(indicators)
@@ -73,51 +216,102 @@ Provide a concise actionable insight (maximum 4 lines):
 Keep it professional, actionable, and under 200 words."""
 
             # Generate insight
-            response = self.model.generate_content(prompt)
+            insight = await self._generate(prompt, on_chunk)
             
-            if response and response.text:
-                insight = response.text.strip()
+            if insight:
                 logger.info(f"Generated AI insight for {symbol}")
                 return f"🤖 AI Insight for {symbol}:\n\n{insight}"
             else:
-                return f"Unable to generate AI insight for {symbol}"
+                return AIFailure(f"Unable to generate AI insight for {symbol}")
                 
         except Exception as e:
             logger.error(f"Failed to generate AI insight for {symbol}: {e}")
-            return f"Error generating AI insight for {symbol}: {str(e)}"
+            return AIFailure(f"Error generating AI insight for {symbol}: {str(e)}")
+
+    async def batch_insights(self, symbols: List[str]) -> Dict[str, str]:
+        """Generate insights for several stocks with a single Gemini call"""
+        symbols = [symbol.upper() for symbol in symbols]
+        if not self.model:
+            return {symbol: AIFailure("AI insights unavailable - Gemini not configured") for symbol in symbols}
+
+        # Pre-compute indicators and news for every symbol concurrently
+        indicators_list, news_list = await asyncio.gather(
+            asyncio.gather(*(asyncio.to_thread(self.stock_analyzer.calculate_technical_indicators, symbol)
+                             for symbol in symbols)),
+            asyncio.gather(*(asyncio.to_thread(self.stock_analyzer.get_stock_news, symbol, limit=3)
+                             for symbol in symbols))
+        )
+
+        insights = {}
+        blocks = []
+        for symbol, indicators, news in zip(symbols, indicators_list, news_list):
+            if not indicators:
+                insights[symbol] = AIFailure(f"Unable to generate insights for {symbol} - insufficient data")
+                continue
+            blocks.append(f"""Stock: {symbol}
+Technical Indicators Summary:
+{self._format_technical_summary(indicators)}
+Recent News Headlines:
+{self._format_news_summary(news)}""")
+
+        if not blocks:
+            return insights
+        stock_blocks = "\n\n".join(blocks)
+
+        prompt = f"""You are a professional stock market assistant with expertise in technical analysis and market sentiment.
+
+For each of the following stocks, provide a concise actionable insight (maximum 4 lines):
+- Clear Buy/Sell/Hold recommendation with confidence level
+- Primary reason combining technical patterns and market sentiment
+- Short-term outlook (next 1-2 weeks)
+
+{stock_blocks}
+
+Return ONLY a JSON object mapping each stock symbol to its insight text, e.g. {{"SYMBOL": "insight"}}."""
+
+        try:
+            raw = await self._generate(prompt)
+            # Strip a Markdown code fence if the model wrapped its JSON in one
+            raw = raw.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+            parsed = json.loads(raw)
+            for symbol, insight in parsed.items():
+                symbol = str(symbol).upper()
+                if symbol in symbols and symbol not in insights and insight:
+                    insights[symbol] = f"🤖 AI Insight for {symbol}:\n\n{str(insight).strip()}"
+            logger.info(f"Generated batch AI insights for {len(parsed)} stocks")
+        except Exception as e:
+            logger.warning(f"Batch insight failed, falling back to per-stock calls: {e}")
+
+        # Fall back to individual calls for anything the batch response missed
+        missing = [symbol for symbol in symbols if symbol not in insights]
+        if missing:
+            results = await asyncio.gather(*(self.generate_stock_insight(symbol) for symbol in missing))
+            insights.update(zip(missing, results))
+
+        return {symbol: insights[symbol] for symbol in symbols}
 
-    def analyze_portfolio(self, stocks_data: List[Dict]) -> str:
-        """Generate portfolio-level insights"""
+    async def analyze_portfolio(self, stocks_data: List[Dict],
+                                on_chunk: Optional[Callable[[str], Awaitable[None]]] = None,
+                                stats: Optional[PortfolioStats] = None) -> str:
+        """Generate portfolio-level insights, reusing precomputed stats when given"""
         if not self.model or not stocks_data:
-            return "Portfolio analysis unavailable"
+            return AIFailure("Portfolio analysis unavailable")
 
         try:
-            portfolio_summary = []
-            total_value = 0
-            winners = 0
-            losers = 0
+            if stats is None:
+                stats = compute_portfolio_stats(stocks_data)
             
-            for stock in stocks_data:
-                symbol = stock.get('Stock Symbol', '')
-                buy_price = float(stock.get('Buy Price', 0))
-                current_price = float(stock.get('Current Price', 0))
-                
-                if buy_price > 0 and current_price > 0:
-                    pnl_percent = ((current_price - buy_price) / buy_price) * 100
-                    portfolio_summary.append(f"{symbol}: {pnl_percent:+.1f}%")
-                    
-                    if pnl_percent > 0:
-                        winners += 1
-                    else:
-                        losers += 1
+            portfolio_summary = "\n".join(
+                f"{symbol}: {pnl_percent:+.1f}%" for symbol, pnl_percent in zip(stats.symbols, stats.pnls)
+            )
 
             prompt = f"""You are a portfolio manager analyzing a stock watchlist.
 
 Portfolio Performance:
-{chr(10).join(portfolio_summary)}
+{portfolio_summary}
 
-Winners: {winners} stocks
-Losers: {losers} stocks
+Winners: {stats.winners} stocks
+Losers: {stats.losers} stocks
 
 Provide a brief portfolio analysis (maximum 5 lines):
 - Overall portfolio health assessment
@@ -127,26 +321,29 @@ Provide a brief portfolio analysis (maximum 5 lines):
 
 Keep it concise and actionable."""
 
-            response = self.model.generate_content(prompt)
+            analysis = await self._generate(prompt, on_chunk)
             
-            if response and response.text:
-                return f"📊 Portfolio Analysis:\n\n{response.text.strip()}"
+            if analysis:
+                return f"📊 Portfolio Analysis:\n\n{analysis}"
             else:
-                return "Unable to generate portfolio analysis"
+                return AIFailure("Unable to generate portfolio analysis")
                 
         except Exception as e:
             logger.error(f"Failed to analyze portfolio: {e}")
-            return f"Error analyzing portfolio: {str(e)}"
+            return AIFailure(f"Error analyzing portfolio: {str(e)}")
 
-    def get_buy_sell_advice(self, symbol: str, action_type: str) -> str:
+    async def get_buy_sell_advice(self, symbol: str, action_type: str,
+                            on_chunk: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
         """Get specific buy or sell advice"""
         if not self.model:
-            return f"{action_type.title()} advice unavailable - AI not configured"
+            return AIFailure(f"{action_type.title()} advice unavailable - AI not configured")
 
         try:
-            # Get current technical analysis
-            indicators = self.stock_analyzer.calculate_technical_indicators(symbol)
-            news = self.stock_analyzer.get_stock_news(symbol, limit=2)
+            # Get current technical analysis and news concurrently
+            indicators, news = await asyncio.gather(
+                asyncio.to_thread(self.stock_analyzer.calculate_technical_indicators, symbol),
+                asyncio.to_thread(self.stock_analyzer.get_stock_news, symbol, limit=2)
+            )
             
             tech_summary = self._format_technical_summary(indicators)
             news_summary = self._format_news_summary(news)
@@ -166,82 +363,52 @@ Provide focused {action_type} advice (maximum 3 lines):
 
 Be direct and actionable."""
 
-            response = self.model.generate_content(prompt)
+            advice = await self._generate(prompt, on_chunk)
             
-            if response and response.text:
-                return f"💡 {action_type.title()} Advice for {symbol}:\n\n{response.text.strip()}"
+            if advice:
+                return f"💡 {action_type.title()} Advice for {symbol}:\n\n{advice}"
             else:
-                return f"Unable to generate {action_type} advice for {symbol}"
+                return AIFailure(f"Unable to generate {action_type} advice for {symbol}")
                 
         except Exception as e:
             logger.error(f"Failed to generate {action_type} advice for {symbol}: {e}")
-            return f"Error generating {action_type} advice: {str(e)}"
+            return AIFailure(f"Error generating {action_type} advice: {str(e)}")
 
     def _format_technical_summary(self, indicators: Dict) -> str:
         """Format technical indicators for AI prompt"""
         if not indicators:
             return "Technical data unavailable"
         
-        summary = []
-        
-        # RSI
-        rsi = indicators.get('rsi', 50)
-        if rsi < 30:
-            summary.append(f"RSI: {rsi:.1f} (Oversold)")
-        elif rsi > 70:
-            summary.append(f"RSI: {rsi:.1f} (Overbought)")
-        else:
-            summary.append(f"RSI: {rsi:.1f} (Neutral)")
-        
-        # MACD
-        macd = indicators.get('macd', 0)
-        macd_signal = indicators.get('macd_signal', 0)
-        if macd > macd_signal:
-            summary.append("MACD: Bullish crossover")
-        else:
-            summary.append("MACD: Bearish crossover")
-        
-        # Bollinger Bands
-        bb_position = indicators.get('bb_position', 0.5)
-        if bb_position > 0.8:
-            summary.append("Bollinger Bands: Near upper band")
-        elif bb_position < 0.2:
-            summary.append("Bollinger Bands: Near lower band")
-        else:
-            summary.append("Bollinger Bands: Middle range")
-        
-        # EMA Crossover
-        ema_50 = indicators.get('ema_50', 0)
-        ema_200 = indicators.get('ema_200', 0)
-        if ema_50 > ema_200:
-            summary.append("EMA: Golden cross (50 > 200)")
-        else:
-            summary.append("EMA: Death cross (50 < 200)")
-        
-        return " | ".join(summary)
+        rsi = float(indicators.get('rsi', 50))
+        bb_position = float(indicators.get('bb_position', 0.5))
+        # Categories come from the raw values; rounding them could flip a crossover
+        key = (
+            round(rsi, 1),
+            rsi < 30,
+            rsi > 70,
+            float(indicators.get('macd', 0)) > float(indicators.get('macd_signal', 0)),
+            bb_position > 0.8,
+            bb_position < 0.2,
+            float(indicators.get('ema_50', 0)) > float(indicators.get('ema_200', 0))
+        )
+        return _technical_summary_cached(key)
 
     def _format_news_summary(self, news: List[Dict]) -> str:
         """Format news for AI prompt"""
         if not news:
             return "No recent news available"
         
-        headlines = []
-        for item in news:
-            title = item.get('title', '')
-            if title:
-                headlines.append(f"• {title[:80]}...")
-        
-        return "\n".join(headlines) if headlines else "No recent news available"
+        return _news_summary_cached(tuple(item.get('title', '') for item in news))
 
-    def get_market_sentiment(self, symbol: str) -> str:
+    async def get_market_sentiment(self, symbol: str, on_chunk: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
         """Analyze market sentiment for a stock"""
         if not self.model:
-            return "Sentiment analysis unavailable"
+            return AIFailure("Sentiment analysis unavailable")
 
         try:
-            news = self.stock_analyzer.get_stock_news(symbol, limit=5)
+            news = await asyncio.to_thread(self.stock_analyzer.get_stock_news, symbol, limit=5)
             if not news:
-                return f"No recent news found for sentiment analysis of {symbol}"
+                return AIFailure(f"No recent news found for sentiment analysis of {symbol}")
 
             news_text = "\n".join([item.get('title', '') + " " + item.get('summary', '')[:100] 
                                  for item in news])
@@ -257,13 +424,13 @@ Provide sentiment analysis:
 
 Keep response under 100 words."""
 
-            response = self.model.generate_content(prompt)
+            sentiment = await self._generate(prompt, on_chunk)
             
-            if response and response.text:
-                return f"📰 Market Sentiment for {symbol}:\n\n{response.text.strip()}"
+            if sentiment:
+                return f"📰 Market Sentiment for {symbol}:\n\n{sentiment}"
             else:
-                return f"Unable to analyze sentiment for {symbol}"
+                return AIFailure(f"Unable to analyze sentiment for {symbol}")
                 
         except Exception as e:
             logger.error(f"Failed to analyze sentiment for {symbol}: {e}")
-            return f"Error analyzing sentiment: {str(e)}"
\ No newline at end of file
+            return AIFailure(f"Error analyzing sentiment: {str(e)}")
\ No newline at end of file
@@ -1,7 +1,13 @@
 import logging
-from typing import List, Dict, Tuple
+import functools
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
-from enum import Enum
+from enum import Enum, IntEnum
+import numpy as np
+from portfolio import PortfolioStats, column_array, compute_portfolio_stats, to_float
 
 logger = logging.getLogger(__name__)
 
@@ -12,338 +18,393 @@ class AlertType(Enum):
     TECHNICAL_SELL = "technical_sell"
     NEWS_ALERT = "news_alert"
     VOLUME_SPIKE = "volume_spike"
+    PORTFOLIO_LOSS = "portfolio_loss"
+    LOW_WINRATE = "low_winrate"
+
+class Priority(IntEnum):
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+    CRITICAL = 3
+
+# Indexed by Priority value
+PRIORITY_EMOJI = ('ℹ️', '⚠️', '❗', '🚨')
+
+@functools.lru_cache(maxsize=None)
+def _pretty(alert_type) -> str:
+    """Human-readable alert type name (only a handful of distinct values exist)"""
+    value = alert_type.value if isinstance(alert_type, AlertType) else str(alert_type)
+    return value.replace('_', ' ').title()
+
+@dataclass(slots=True)
+class Alert:
+    type: AlertType
+    symbol: str
+    message: str
+    timestamp: datetime
+    priority: Priority = Priority.LOW
+    current_price: float = 0.0
+    trigger_price: float = 0.0
+    indicator: str = ''
+    value: float = 0.0
+    ts_str: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Rendered once here so formatting many alerts does no strftime work
+        self.ts_str = f"{self.timestamp:%H:%M:%S}"
+
+    @property
+    def label(self) -> str:
+        """Human-readable alert type, e.g. 'Target Hit'"""
+        return _pretty(self.type)
+
+# Alert message templates, filled via str.format_map with a per-check context
+_MSG_TARGET_HIT = (
+    "🎯 TARGET HIT: {symbol} reached ${current_price:.2f} (Target: ${target_price:.2f})\n"
+    "💰 Profit: +{pnl_percent:.1f}%\n"
+    "💡 Consider taking profits or adjusting stop-loss"
+)
+_MSG_STOP_LOSS_HIT = (
+    "🛑 STOP LOSS HIT: {symbol} dropped to ${current_price:.2f} (Stop: ${stop_loss:.2f})\n"
+    "📉 Loss: {pnl_percent:.1f}%\n"
+    "⚠️ Consider exiting position to limit losses"
+)
+_MSG_APPROACHING_TARGET = (
+    "📈 APPROACHING TARGET: {symbol} at ${current_price:.2f}\n"
+    "🎯 Target: ${target_price:.2f} (95% reached)\n"
+    "💡 Monitor closely for exit opportunity"
+)
+_MSG_APPROACHING_STOP = (
+    "⚠️ APPROACHING STOP LOSS: {symbol} at ${current_price:.2f}\n"
+    "🛑 Stop Loss: ${stop_loss:.2f}\n"
+    "📊 Consider technical analysis for trend reversal"
+)
+_MSG_RSI_OVERSOLD = (
+    "📊 TECHNICAL BUY SIGNAL: {symbol}\n"
+    "🔴 RSI: {rsi:.1f} (Severely Oversold)\n"
+    "💡 Potential bounce opportunity"
+)
+_MSG_RSI_OVERBOUGHT = (
+    "📊 TECHNICAL SELL SIGNAL: {symbol}\n"
+    "🔴 RSI: {rsi:.1f} (Severely Overbought)\n"
+    "⚠️ Correction may be imminent"
+)
+_MSG_MACD_BULLISH = (
+    "📊 MACD BULLISH CROSSOVER: {symbol}\n"
+    "📈 MACD crossed above signal line\n"
+    "💡 Potential uptrend beginning"
+)
+_MSG_BB_LOWER = (
+    "📊 BOLLINGER BAND SQUEEZE: {symbol}\n"
+    "📉 Price at lower Bollinger Band\n"
+    "💡 Potential reversal opportunity"
+)
+_MSG_BB_UPPER = (
+    "📊 BOLLINGER BAND EXTENSION: {symbol}\n"
+    "📈 Price at upper Bollinger Band\n"
+    "⚠️ Potential pullback ahead"
+)
+_MSG_GOLDEN_CROSS = (
+    "📊 GOLDEN CROSS DETECTED: {symbol}\n"
+    "🌟 50 EMA crossed above 200 EMA\n"
+    "📈 Long-term bullish signal"
+)
+_MSG_PORTFOLIO_LOSS = (
+    "📉 **PORTFOLIO ALERT**\n"
+    "Average Loss: {avg_pnl:.1f}%\n"
+    "Win Rate: {win_rate:.1f}%\n"
+    "🔍 Review positions for risk management"
+)
+_MSG_LOW_WINRATE = (
+    "⚠️ **LOW WIN RATE ALERT**\n"
+    "Win Rate: {win_rate:.1f}%\n"
+    "Profitable: {profitable_positions}/{total_positions}\n"
+    "💡 Consider strategy review"
+)
 
 class AlertManager:
     def __init__(self):
-        self.alert_history = []
+        self.alert_history = deque(maxlen=100)  # Recent alerts for the /alerts view
         self.cooldown_period = timedelta(hours=1)  # Prevent spam alerts
+        self._last_sent: Dict[Tuple[str, AlertType], float] = {}  # (symbol, type) -> monotonic send time
 
-    def check_price_alerts(self, stock_data: Dict) -> List[Dict]:
+    def check_price_alerts(self, stock_data: Dict) -> List[Alert]:
         """Check for price-based alerts (target/stop-loss)"""
+        return self.check_price_alerts_bulk([stock_data])
+
+    def check_price_alerts_bulk(self, stocks_data: List[Dict]) -> List[Alert]:
+        """Check price-based alerts for a whole watchlist with vectorized comparisons"""
         alerts = []
+        if not stocks_data:
+            return alerts
+        now = datetime.now()
+        
+        current = column_array(stocks_data, 'Current Price')
+        target = column_array(stocks_data, 'Target Price')
+        stop = column_array(stocks_data, 'Stop Loss')
+        buy = column_array(stocks_data, 'Buy Price')
+        
+        valid = (current != 0) & (target != 0) & (stop != 0) & (buy != 0)
+        pnl = np.divide(current - buy, buy, out=np.zeros_like(buy), where=valid) * 100
+        
+        # Hit / stop-loss, then approaching levels (5% buffer)
+        target_buffer = target * 0.95
+        stop_buffer = stop * 1.05
+        hit = valid & (current >= target)
+        stopped = valid & ~hit & (current <= stop)
+        near_target = valid & (target_buffer <= current) & (current < target)
+        near_stop = valid & ~near_target & (stop < current) & (current <= stop_buffer)
         
-        try:
-            symbol = stock_data.get('Stock Symbol', '')
-            current_price = float(stock_data.get('Current Price', 0))
-            target_price = float(stock_data.get('Target Price', 0))
-            stop_loss = float(stock_data.get('Stop Loss', 0))
-            buy_price = float(stock_data.get('Buy Price', 0))
+        # Python only touches the rows that actually triggered something
+        for i in np.flatnonzero(hit | stopped | near_target | near_stop):
+            symbol = str(stocks_data[i].get('Stock Symbol', '')).strip()
+            price_ctx = {
+                'symbol': symbol,
+                'current_price': current[i],
+                'target_price': target[i],
+                'stop_loss': stop[i],
+                'pnl_percent': pnl[i]
+            }
             
-            if not all([current_price, target_price, stop_loss, buy_price]):
-                return alerts
-
-            # Check target price hit
-            if current_price >= target_price:
-                profit_percent = ((current_price - buy_price) / buy_price) * 100
-                alert = {
-                    'type': AlertType.TARGET_HIT,
-                    'symbol': symbol,
-                    'message': f"🎯 TARGET HIT: {symbol} reached ${current_price:.2f} (Target: ${target_price:.2f})\n"
-                              f"💰 Profit: +{profit_percent:.1f}%\n"
-                              f"💡 Consider taking profits or adjusting stop-loss",
-                    'current_price': current_price,
-                    'trigger_price': target_price,
-                    'timestamp': datetime.now(),
-                    'priority': 'HIGH'
-                }
-                alerts.append(alert)
-
-            # Check stop loss hit
-            elif current_price <= stop_loss:
-                loss_percent = ((current_price - buy_price) / buy_price) * 100
-                alert = {
-                    'type': AlertType.STOP_LOSS,
-                    'symbol': symbol,
-                    'message': f"🛑 STOP LOSS HIT: {symbol} dropped to ${current_price:.2f} (Stop: ${stop_loss:.2f})\n"
-                              f"📉 Loss: {loss_percent:.1f}%\n"
-                              f"⚠️ Consider exiting position to limit losses",
-                    'current_price': current_price,
-                    'trigger_price': stop_loss,
-                    'timestamp': datetime.now(),
-                    'priority': 'CRITICAL'
-                }
-                alerts.append(alert)
-
-            # Check for price approaching levels (5% buffer)
-            target_buffer = target_price * 0.95
-            stop_buffer = stop_loss * 1.05
+            if hit[i]:
+                alerts.append(Alert(
+                    type=AlertType.TARGET_HIT,
+                    symbol=symbol,
+                    message=_MSG_TARGET_HIT.format_map(price_ctx),
+                    current_price=float(current[i]),
+                    trigger_price=float(target[i]),
+                    timestamp=now,
+                    priority=Priority.HIGH
+                ))
+            elif stopped[i]:
+                alerts.append(Alert(
+                    type=AlertType.STOP_LOSS,
+                    symbol=symbol,
+                    message=_MSG_STOP_LOSS_HIT.format_map(price_ctx),
+                    current_price=float(current[i]),
+                    trigger_price=float(stop[i]),
+                    timestamp=now,
+                    priority=Priority.CRITICAL
+                ))
             
-            if target_buffer <= current_price < target_price:
-                alert = {
-                    'type': AlertType.TARGET_HIT,
-                    'symbol': symbol,
-                    'message': f"📈 APPROACHING TARGET: {symbol} at ${current_price:.2f}\n"
-                              f"🎯 Target: ${target_price:.2f} (95% reached)\n"
-                              f"💡 Monitor closely for exit opportunity",
-                    'current_price': current_price,
-                    'trigger_price': target_buffer,
-                    'timestamp': datetime.now(),
-                    'priority': 'MEDIUM'
-                }
-                alerts.append(alert)
-
-            elif stop_loss < current_price <= stop_buffer:
-                alert = {
-                    'type': AlertType.STOP_LOSS,
-                    'symbol': symbol,
-                    'message': f"⚠️ APPROACHING STOP LOSS: {symbol} at ${current_price:.2f}\n"
-                              f"🛑 Stop Loss: ${stop_loss:.2f}\n"
-                              f"📊 Consider technical analysis for trend reversal",
-                    'current_price': current_price,
-                    'trigger_price': stop_buffer,
-                    'timestamp': datetime.now(),
-                    'priority': 'MEDIUM'
-                }
-                alerts.append(alert)
-
-        except Exception as e:
-            logger.error(f"Failed to check price alerts for {stock_data.get('Stock Symbol', 'Unknown')}: {e}")
+            if near_target[i]:
+                alerts.append(Alert(
+                    type=AlertType.TARGET_HIT,
+                    symbol=symbol,
+                    message=_MSG_APPROACHING_TARGET.format_map(price_ctx),
+                    current_price=float(current[i]),
+                    trigger_price=float(target_buffer[i]),
+                    timestamp=now,
+                    priority=Priority.MEDIUM
+                ))
+            elif near_stop[i]:
+                alerts.append(Alert(
+                    type=AlertType.STOP_LOSS,
+                    symbol=symbol,
+                    message=_MSG_APPROACHING_STOP.format_map(price_ctx),
+                    current_price=float(current[i]),
+                    trigger_price=float(stop_buffer[i]),
+                    timestamp=now,
+                    priority=Priority.MEDIUM
+                ))
 
         return alerts
 
-    def check_technical_alerts(self, symbol: str, indicators: Dict) -> List[Dict]:
+    def check_technical_alerts(self, symbol: str, indicators: Dict) -> List[Alert]:
         """Check for technical indicator alerts"""
         alerts = []
+        now = datetime.now()
         
-        try:
-            if not indicators:
-                return alerts
+        if not indicators:
+            return alerts
 
-            # RSI alerts
-            rsi = indicators.get('rsi', 50)
-            if rsi <= 25:  # Severely oversold
-                alert = {
-                    'type': AlertType.TECHNICAL_BUY,
-                    'symbol': symbol,
-                    'message': f"📊 TECHNICAL BUY SIGNAL: {symbol}\n"
-                              f"🔴 RSI: {rsi:.1f} (Severely Oversold)\n"
-                              f"💡 Potential bounce opportunity",
-                    'indicator': 'RSI',
-                    'value': rsi,
-                    'timestamp': datetime.now(),
-                    'priority': 'HIGH'
-                }
-                alerts.append(alert)
-            elif rsi >= 75:  # Severely overbought
-                alert = {
-                    'type': AlertType.TECHNICAL_SELL,
-                    'symbol': symbol,
-                    'message': f"📊 TECHNICAL SELL SIGNAL: {symbol}\n"
-                              f"🔴 RSI: {rsi:.1f} (Severely Overbought)\n"
-                              f"⚠️ Correction may be imminent",
-                    'indicator': 'RSI',
-                    'value': rsi,
-                    'timestamp': datetime.now(),
-                    'priority': 'HIGH'
-                }
-                alerts.append(alert)
+        # RSI alerts
+        rsi = to_float(indicators.get('rsi', 50), 50)
+        tech_ctx = {'symbol': symbol, 'rsi': rsi}
+        if rsi <= 25:  # Severely oversold
+            alert = Alert(
+                type=AlertType.TECHNICAL_BUY,
+                symbol=symbol,
+                message=_MSG_RSI_OVERSOLD.format_map(tech_ctx),
+                indicator='RSI',
+                value=rsi,
+                timestamp=now,
+                priority=Priority.HIGH
+            )
+            alerts.append(alert)
+        elif rsi >= 75:  # Severely overbought
+            alert = Alert(
+                type=AlertType.TECHNICAL_SELL,
+                symbol=symbol,
+                message=_MSG_RSI_OVERBOUGHT.format_map(tech_ctx),
+                indicator='RSI',
+                value=rsi,
+                timestamp=now,
+                priority=Priority.HIGH
+            )
+            alerts.append(alert)
 
-            # MACD crossover alerts
-            macd = indicators.get('macd', 0)
-            macd_signal = indicators.get('macd_signal', 0)
-            macd_hist = indicators.get('macd_histogram', 0)
-            
-            # Bullish crossover (MACD crosses above signal line)
-            if macd > macd_signal and abs(macd - macd_signal) < 0.1:  # Close crossover
-                alert = {
-                    'type': AlertType.TECHNICAL_BUY,
-                    'symbol': symbol,
-                    'message': f"📊 MACD BULLISH CROSSOVER: {symbol}\n"
-                              f"📈 MACD crossed above signal line\n"
-                              f"💡 Potential uptrend beginning",
-                    'indicator': 'MACD',
-                    'value': macd - macd_signal,
-                    'timestamp': datetime.now(),
-                    'priority': 'MEDIUM'
-                }
-                alerts.append(alert)
-
-            # Bollinger Bands alerts
-            bb_position = indicators.get('bb_position', 0.5)
-            if bb_position <= 0.05:  # At lower band
-                alert = {
-                    'type': AlertType.TECHNICAL_BUY,
-                    'symbol': symbol,
-                    'message': f"📊 BOLLINGER BAND SQUEEZE: {symbol}\n"
-                              f"📉 Price at lower Bollinger Band\n"
-                              f"💡 Potential reversal opportunity",
-                    'indicator': 'Bollinger Bands',
-                    'value': bb_position,
-                    'timestamp': datetime.now(),
-                    'priority': 'MEDIUM'
-                }
-                alerts.append(alert)
-            elif bb_position >= 0.95:  # At upper band
-                alert = {
-                    'type': AlertType.TECHNICAL_SELL,
-                    'symbol': symbol,
-                    'message': f"📊 BOLLINGER BAND EXTENSION: {symbol}\n"
-                              f"📈 Price at upper Bollinger Band\n"
-                              f"⚠️ Potential pullback ahead",
-                    'indicator': 'Bollinger Bands',
-                    'value': bb_position,
-                    'timestamp': datetime.now(),
-                    'priority': 'MEDIUM'
-                }
-                alerts.append(alert)
+        # MACD crossover alerts
+        macd = to_float(indicators.get('macd', 0))
+        macd_signal = to_float(indicators.get('macd_signal', 0))
+        
+        # Bullish crossover (MACD crosses above signal line)
+        if macd > macd_signal and abs(macd - macd_signal) < 0.1:  # Close crossover
+            alert = Alert(
+                type=AlertType.TECHNICAL_BUY,
+                symbol=symbol,
+                message=_MSG_MACD_BULLISH.format_map(tech_ctx),
+                indicator='MACD',
+                value=macd - macd_signal,
+                timestamp=now,
+                priority=Priority.MEDIUM
+            )
+            alerts.append(alert)
 
-            # Golden Cross / Death Cross alerts
-            ema_50 = indicators.get('ema_50', 0)
-            ema_200 = indicators.get('ema_200', 0)
-            current_price = indicators.get('current_price', 0)
-            
-            if ema_50 > ema_200 and abs(ema_50 - ema_200) / ema_200 < 0.02:  # Recent golden cross
-                alert = {
-                    'type': AlertType.TECHNICAL_BUY,
-                    'symbol': symbol,
-                    'message': f"📊 GOLDEN CROSS DETECTED: {symbol}\n"
-                              f"🌟 50 EMA crossed above 200 EMA\n"
-                              f"📈 Long-term bullish signal",
-                    'indicator': 'EMA Cross',
-                    'value': (ema_50 - ema_200) / ema_200,
-                    'timestamp': datetime.now(),
-                    'priority': 'HIGH'
-                }
-                alerts.append(alert)
+        # Bollinger Bands alerts
+        bb_position = to_float(indicators.get('bb_position', 0.5), 0.5)
+        if bb_position <= 0.05:  # At lower band
+            alert = Alert(
+                type=AlertType.TECHNICAL_BUY,
+                symbol=symbol,
+                message=_MSG_BB_LOWER.format_map(tech_ctx),
+                indicator='Bollinger Bands',
+                value=bb_position,
+                timestamp=now,
+                priority=Priority.MEDIUM
+            )
+            alerts.append(alert)
+        elif bb_position >= 0.95:  # At upper band
+            alert = Alert(
+                type=AlertType.TECHNICAL_SELL,
+                symbol=symbol,
+                message=_MSG_BB_UPPER.format_map(tech_ctx),
+                indicator='Bollinger Bands',
+                value=bb_position,
+                timestamp=now,
+                priority=Priority.MEDIUM
+            )
+            alerts.append(alert)
 
-        except Exception as e:
-            logger.error(f"Failed to check technical alerts for {symbol}: {e}")
+        # Golden Cross / Death Cross alerts
+        ema_50 = to_float(indicators.get('ema_50', 0))
+        ema_200 = to_float(indicators.get('ema_200', 0))
+        
+        if ema_200 > 0 and ema_50 > ema_200 and abs(ema_50 - ema_200) / ema_200 < 0.02:  # Recent golden cross
+            alert = Alert(
+                type=AlertType.TECHNICAL_BUY,
+                symbol=symbol,
+                message=_MSG_GOLDEN_CROSS.format_map(tech_ctx),
+                indicator='EMA Cross',
+                value=(ema_50 - ema_200) / ema_200,
+                timestamp=now,
+                priority=Priority.HIGH
+            )
+            alerts.append(alert)
 
         return alerts
 
-    def filter_duplicate_alerts(self, new_alerts: List[Dict]) -> List[Dict]:
+    def filter_duplicate_alerts(self, new_alerts: List[Alert]) -> List[Alert]:
         """Filter out duplicate alerts based on cooldown period"""
         filtered_alerts = []
-        current_time = datetime.now()
+        current_time = time.monotonic()
+        cooldown_seconds = self.cooldown_period.total_seconds()
         
         for alert in new_alerts:
-            # Check if similar alert was sent recently
-            is_duplicate = False
-            for historical_alert in self.alert_history:
-                if (historical_alert['symbol'] == alert['symbol'] and
-                    historical_alert['type'] == alert['type'] and
-                    current_time - historical_alert['timestamp'] < self.cooldown_period):
-                    is_duplicate = True
-                    break
+            # Skip if a similar alert was sent within the cooldown period
+            key = (alert.symbol, alert.type)
+            last_sent = self._last_sent.get(key)
+            if last_sent is not None and current_time - last_sent < cooldown_seconds:
+                continue
             
-            if not is_duplicate:
-                filtered_alerts.append(alert)
-                # Add to history
-                self.alert_history.append(alert)
-        
-        # Clean old alerts from history (keep last 100)
-        self.alert_history = self.alert_history[-100:]
+            filtered_alerts.append(alert)
+            self._last_sent[key] = current_time
+            # Add to history (deque drops the oldest beyond 100)
+            self.alert_history.append(alert)
         
         return filtered_alerts
 
-    def format_alert_message(self, alert: Dict) -> str:
+    def format_alert_message(self, alert: Alert) -> str:
         """Format alert message for Telegram"""
-        priority_emoji = {
-            'CRITICAL': '🚨',
-            'HIGH': '❗',
-            'MEDIUM': '⚠️',
-            'LOW': 'ℹ️'
-        }
-        
-        emoji = priority_emoji.get(alert.get('priority', 'LOW'), 'ℹ️')
-        timestamp = alert['timestamp'].strftime("%H:%M:%S")
-        
-        return f"{emoji} **ALERT** - {timestamp}\n\n{alert['message']}"
+        emoji = PRIORITY_EMOJI[alert.priority]
+        return f"{emoji} **ALERT** - {alert.ts_str}\n\n{alert.message}"
 
-    def get_alert_summary(self, alerts: List[Dict]) -> str:
+    def get_alert_summary(self, alerts: List[Alert]) -> str:
         """Generate summary of multiple alerts"""
         if not alerts:
             return "No alerts at this time."
         
         summary = f"📋 **Alert Summary** ({len(alerts)} alerts)\n\n"
         
-        # Group by priority
-        critical = [a for a in alerts if a.get('priority') == 'CRITICAL']
-        high = [a for a in alerts if a.get('priority') == 'HIGH']
-        medium = [a for a in alerts if a.get('priority') == 'MEDIUM']
+        # Group by priority in a single pass
+        groups = defaultdict(list)
+        for alert in alerts:
+            groups[alert.priority].append(alert)
+        
+        critical = groups[Priority.CRITICAL]
+        high = groups[Priority.HIGH]
+        medium = groups[Priority.MEDIUM]
         
         if critical:
             summary += f"🚨 **CRITICAL ({len(critical)}):**\n"
             for alert in critical:
-                summary += f"• {alert['symbol']}: {alert['type'].value.replace('_', ' ').title()}\n"
+                summary += f"• {alert.symbol}: {alert.label}\n"
             summary += "\n"
         
         if high:
             summary += f"❗ **HIGH ({len(high)}):**\n"
             for alert in high:
-                summary += f"• {alert['symbol']}: {alert['type'].value.replace('_', ' ').title()}\n"
+                summary += f"• {alert.symbol}: {alert.label}\n"
             summary += "\n"
         
         if medium:
             summary += f"⚠️ **MEDIUM ({len(medium)}):**\n"
             for alert in medium:
-                summary += f"• {alert['symbol']}: {alert['type'].value.replace('_', ' ').title()}\n"
+                summary += f"• {alert.symbol}: {alert.label}\n"
         
         return summary
 
-    def check_portfolio_alerts(self, stocks_data: List[Dict]) -> List[Dict]:
-        """Check for portfolio-wide alerts"""
+    def check_portfolio_alerts(self, stocks_data: List[Dict],
+                               stats: Optional[PortfolioStats] = None) -> List[Alert]:
+        """Check for portfolio-wide alerts, reusing precomputed stats when given"""
         alerts = []
+        now = datetime.now()
         
-        try:
-            if not stocks_data:
-                return alerts
-            
-            total_positions = len(stocks_data)
-            profitable_positions = 0
-            losing_positions = 0
-            total_pnl = 0
+        if not stocks_data:
+            return alerts
+        
+        if stats is None:
+            stats = compute_portfolio_stats(stocks_data)
+        
+        # Portfolio performance alerts
+        if stats.total_positions > 0:
+            portfolio_ctx = {
+                'avg_pnl': stats.avg_pnl,
+                'win_rate': stats.win_rate,
+                'profitable_positions': stats.winners,
+                'total_positions': stats.total_positions
+            }
             
-            for stock in stocks_data:
-                try:
-                    buy_price = float(stock.get('Buy Price', 0))
-                    current_price = float(stock.get('Current Price', 0))
-                    
-                    if buy_price > 0 and current_price > 0:
-                        pnl_percent = ((current_price - buy_price) / buy_price) * 100
-                        total_pnl += pnl_percent
-                        
-                        if pnl_percent > 0:
-                            profitable_positions += 1
-                        else:
-                            losing_positions += 1
-                except:
-                    continue
+            # Significant portfolio loss alert
+            if stats.avg_pnl <= -10:
+                alert = Alert(
+                    type=AlertType.PORTFOLIO_LOSS,
+                    symbol='PORTFOLIO',
+                    message=_MSG_PORTFOLIO_LOSS.format_map(portfolio_ctx),
+                    timestamp=now,
+                    priority=Priority.HIGH
+                )
+                alerts.append(alert)
             
-            # Portfolio performance alerts
-            if total_positions > 0:
-                avg_pnl = total_pnl / total_positions
-                win_rate = (profitable_positions / total_positions) * 100
-                
-                # Significant portfolio loss alert
-                if avg_pnl <= -10:
-                    alert = {
-                        'type': 'portfolio_loss',
-                        'symbol': 'PORTFOLIO',
-                        'message': f"📉 **PORTFOLIO ALERT**\n"
-                                  f"Average Loss: {avg_pnl:.1f}%\n"
-                                  f"Win Rate: {win_rate:.1f}%\n"
-                                  f"🔍 Review positions for risk management",
-                        'timestamp': datetime.now(),
-                        'priority': 'HIGH'
-                    }
-                    alerts.append(alert)
-                
-                # Low win rate alert
-                elif win_rate < 30:
-                    alert = {
-                        'type': 'low_winrate',
-                        'symbol': 'PORTFOLIO',
-                        'message': f"⚠️ **LOW WIN RATE ALERT**\n"
-                                  f"Win Rate: {win_rate:.1f}%\n"
-                                  f"Profitable: {profitable_positions}/{total_positions}\n"
-                                  f"💡 Consider strategy review",
-                        'timestamp': datetime.now(),
-                        'priority': 'MEDIUM'
-                    }
-                    alerts.append(alert)
-
-        except Exception as e:
-            logger.error(f"Failed to check portfolio alerts: {e}")
+            # Low win rate alert
+            elif stats.win_rate < 30:
+                alert = Alert(
+                    type=AlertType.LOW_WINRATE,
+                    symbol='PORTFOLIO',
+                    message=_MSG_LOW_WINRATE.format_map(portfolio_ctx),
+                    timestamp=now,
+                    priority=Priority.MEDIUM
+                )
+                alerts.append(alert)
         
         return alerts
\ No newline at end of file
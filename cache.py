@@ -0,0 +1,57 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+def ttl_cache(ttl: float, maxsize: int = 128):
+    """Memoize a function for ttl seconds, evicting least recently used entries past maxsize"""
+    def decorator(func):
+        entries = OrderedDict()  # key -> (expiry, value)
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                entry = entries.get(args)
+                if entry is not None and entry[0] > now:
+                    entries.move_to_end(args)
+                    return entry[1]
+
+            value = func(*args)
+
+            if value:  # Don't pin empty/failed results for a whole window
+                with lock:
+                    entries[args] = (now + ttl, value)
+                    entries.move_to_end(args)
+                    while len(entries) > maxsize:
+                        entries.popitem(last=False)
+            return value
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+    return decorator
+
+class TokenBucket:
+    """Thread-safe token bucket: up to rate acquisitions per second, bursting to capacity"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
\ No newline at end of file
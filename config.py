@@ -1,5 +1,6 @@
 import os
-import json
+import pathlib
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,15 +11,32 @@ CHAT_ID = os.getenv('CHAT_ID')
 
 # Google Sheets Configuration
 GOOGLE_SHEET_ID = os.getenv('GOOGLE_SHEET_ID')
-GOOGLE_SHEETS_CREDENTIALS = json.loads(os.getenv('GOOGLE_SHEETS_CREDENTIALS', '{}'))
+# Prefer a credentials file when GOOGLE_SHEETS_CREDENTIALS_PATH is set, else the inline JSON env var
+GOOGLE_SHEETS_CREDENTIALS_PATH = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH')
+if GOOGLE_SHEETS_CREDENTIALS_PATH:
+    GOOGLE_SHEETS_CREDENTIALS = orjson.loads(pathlib.Path(GOOGLE_SHEETS_CREDENTIALS_PATH).read_bytes())
+else:
+    GOOGLE_SHEETS_CREDENTIALS = orjson.loads(os.getenv('GOOGLE_SHEETS_CREDENTIALS', '{}'))
 
 # Gemini AI Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
+# Webhook Configuration (polling is used when WEBHOOK_URL is unset)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PORT = int(os.getenv('PORT', '8080'))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')  # Checked against Telegram's secret-token header
+
 # Application Configuration
 UPDATE_INTERVAL_MINUTES = 5
 MAX_RETRIES = 3
 REQUEST_TIMEOUT = 30
+PRICE_LOOKUPS_PER_SECOND = 4  # Sync price-path throttle (token bucket)
+INDICATOR_CONCURRENCY = 8  # Parallel historical-data fetches per monitoring tick
+SHEETS_CACHE_TTL_SECONDS = 60  # Refetch the watchlist sheet at most this often
+STREAM_FLUSH_CHUNKS = 5  # Edit streamed Telegram messages every N Gemini chunks
+INSIGHTS_COOLDOWN_SECONDS = 10  # Repeat /insights or advice taps within this window reuse the last answer
+WATCHLIST_PAGE_SIZE = 10  # Stocks per /list page (each adds four inline buttons)
+MAX_INSIGHTS_SYMBOLS = 5  # Symbols per /insights request (one batched Gemini call)
 
 # Stock Data Schema
 STOCK_COLUMNS = [
@@ -0,0 +1,69 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the plain loops below still work, just slower
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# These mirror pandas ewm(adjust=False, min_periods=...) so results match the
+# previous ta/pandas implementation, but only the final value is produced
+
+@njit(cache=True)
+def ema_last(close, span):
+    """Last value of an EMA over close (NaN with fewer than span bars)"""
+    n = close.shape[0]
+    if n < span:
+        return np.nan
+    alpha = 2.0 / (span + 1.0)
+    value = close[0]
+    for i in range(1, n):
+        value = (1.0 - alpha) * value + alpha * close[i]
+    return value
+
+@njit(cache=True)
+def rsi_last(close, period=14):
+    """Last Wilder RSI value over close (NaN with too few bars)"""
+    n = close.shape[0]
+    if n < period:
+        return np.nan
+    alpha = 1.0 / period
+    # ta fills bar 0's missing diff with 0, so both averages start from 0 there
+    gain = 0.0
+    loss = 0.0
+    for i in range(1, n):
+        diff = close[i] - close[i - 1]
+        gain = (1.0 - alpha) * gain + alpha * max(diff, 0.0)
+        loss = (1.0 - alpha) * loss + alpha * max(-diff, 0.0)
+    if loss == 0.0:
+        return 100.0  # ta's value when the down average is 0, flat series included
+    return 100.0 * gain / (gain + loss)
+
+@njit(cache=True)
+def macd_last(close, fast=12, slow=26, signal=9):
+    """(macd, signal) at the last bar; the signal EMA starts at the first valid MACD"""
+    n = close.shape[0]
+    if n < slow:
+        return np.nan, np.nan
+    a_fast = 2.0 / (fast + 1.0)
+    a_slow = 2.0 / (slow + 1.0)
+    a_signal = 2.0 / (signal + 1.0)
+    ema_fast = close[0]
+    ema_slow = close[0]
+    macd = np.nan
+    sig = np.nan
+    for i in range(n):
+        if i > 0:
+            ema_fast = (1.0 - a_fast) * ema_fast + a_fast * close[i]
+            ema_slow = (1.0 - a_slow) * ema_slow + a_slow * close[i]
+        if i >= slow - 1:
+            macd = ema_fast - ema_slow
+            if i == slow - 1:
+                sig = macd
+            else:
+                sig = (1.0 - a_signal) * sig + a_signal * macd
+    if n < slow + signal - 1:
+        sig = np.nan
+    return macd, sig
\ No newline at end of file
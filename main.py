@@ -1,29 +1,37 @@
 import asyncio
+import atexit
 import logging
 import sys
 import signal
 import os
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 # from telegram_bot import TelegramBot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import config
 from telegram_bot import TelegramBot
 from sheets import GoogleSheetsManager
-from stocks import StockAnalyzer
 from ai_insights import AIInsightsManager
 from alerts import AlertManager
+from portfolio import compute_portfolio_stats
 import threading
 
-# Configure logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('stock_bot.log', encoding='utf-8')
-    ]
-)
+# Configure logging with UTF-8 encoding; records go through a queue so the
+# stdout/file writes happen on the listener thread, not the event loop
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.StreamHandler(sys.stdout),
+    logging.FileHandler('stock_bot.log', encoding='utf-8')
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.Queue(-1)
+log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+log_listener.start()
+atexit.register(log_listener.stop)  # Flushes queued records on exit
 
 # Fix console encoding for Windows
 if sys.platform == "win32":
@@ -37,56 +45,80 @@ class StockWatchlistBot:
     def __init__(self):
         self.telegram_bot = TelegramBot()
         self.sheets_manager = GoogleSheetsManager()
-        self.stock_analyzer = StockAnalyzer()
         self.ai_insights = AIInsightsManager()
+        self.stock_analyzer = self.ai_insights.stock_analyzer  # Shared with the bot's handlers
         self.alert_manager = AlertManager()
         self.scheduler = AsyncIOScheduler()
         self.is_running = False
+        self._ran_close_tick = False  # Set once the post-close tick has run
 
     async def monitor_stocks(self):
         """Main monitoring function that runs every 5 minutes"""
         try:
             logger.info("Starting stock monitoring cycle...")
             
-            # Get all stocks from watchlist
-            stocks = self.sheets_manager.get_all_stocks()
+            # Prices don't move outside market hours; run one tick after the
+            # close to capture closing prices, then idle until the next open
+            market_open = self.stock_analyzer.is_market_open()
+            if market_open:
+                self._ran_close_tick = False
+            elif self._ran_close_tick:
+                logger.info("Market closed; skipping monitoring tick")
+                return
+            else:
+                self._ran_close_tick = True
+            
+            # Get all stocks from watchlist (the sheets manager caches the records)
+            stocks = await self.sheets_manager.get_all_stocks_async()
             if not stocks:
                 logger.info("No stocks in watchlist")
                 return
             
             logger.info(f"Monitoring {len(stocks)} stocks")
             
-            # Get current prices for all stocks
-            symbols = [stock.get('Stock Symbol', '') for stock in stocks]
-            current_prices = self.stock_analyzer.bulk_get_prices(symbols)
+            # Fetch current prices and technical indicators concurrently;
+            # both only need the symbol list
+            # Normalize once and skip blank rows so they don't cost a lookup each
+            symbols = [s for s in (str(stock.get('Stock Symbol', '')).strip().upper() for stock in stocks) if s]
+            current_prices, all_indicators = await asyncio.gather(
+                # Alerts must see this tick's prices, never a stale-while-revalidate one
+                self.stock_analyzer.bulk_get_prices_async(
+                    symbols, max_age=config.UPDATE_INTERVAL_MINUTES * 60 - 30
+                ),
+                asyncio.to_thread(self.stock_analyzer.calculate_technical_indicators_bulk, symbols)
+            )
             
-            # Update prices in Google Sheets
+            # Update prices in Google Sheets while the alert checks run
+            sheet_write = None
             if current_prices:
-                self.sheets_manager.bulk_update_prices(current_prices)
-                logger.info(f"Updated prices for {len(current_prices)} stocks")
+                sheet_write = asyncio.create_task(
+                    self.sheets_manager.bulk_update_prices_async(current_prices)
+                )
             
             # Check for alerts
             all_alerts = []
             
+            # Update stock data with current price
             for stock in stocks:
-                symbol = stock.get('Stock Symbol', '')
-                
-                # Update stock data with current price
+                symbol = str(stock.get('Stock Symbol', '')).strip().upper()
                 if symbol in current_prices:
                     stock['Current Price'] = current_prices[symbol]
-                
-                # Check price alerts (target/stop loss)
-                price_alerts = self.alert_manager.check_price_alerts(stock)
-                all_alerts.extend(price_alerts)
-                
-                # Check technical alerts
-                indicators = self.stock_analyzer.calculate_technical_indicators(symbol)
-                if indicators:
-                    tech_alerts = self.alert_manager.check_technical_alerts(symbol, indicators)
-                    all_alerts.extend(tech_alerts)
-            
-            # Check portfolio-level alerts
-            portfolio_alerts = self.alert_manager.check_portfolio_alerts(stocks)
+            
+            # Check price alerts (target/stop loss) for the whole watchlist at once
+            price_alerts = self.alert_manager.check_price_alerts_bulk(stocks)
+            all_alerts.extend(price_alerts)
+            
+            # Check technical alerts
+            for symbol, indicators in all_indicators.items():
+                tech_alerts = self.alert_manager.check_technical_alerts(symbol, indicators)
+                all_alerts.extend(tech_alerts)
+            
+            if sheet_write is not None and await sheet_write:
+                logger.info(f"Updated prices for {len(current_prices)} stocks")
+            
+            # Check portfolio-level alerts from stats computed once for this tick
+            portfolio_stats = compute_portfolio_stats(stocks)
+            portfolio_alerts = self.alert_manager.check_portfolio_alerts(stocks, portfolio_stats)
             all_alerts.extend(portfolio_alerts)
             
             # Filter duplicate alerts
@@ -100,7 +132,6 @@ class StockWatchlistBot:
                 logger.info("No new alerts to send")
             
             # Log market status
-            market_open = self.stock_analyzer.is_market_open()
             logger.info(f"Market status: {'Open' if market_open else 'Closed'}")
             
         except Exception as e:
@@ -179,29 +210,35 @@ class StockWatchlistBot:
             if not stocks:
                 return
             
-            # Calculate daily performance
-            total_positions = len(stocks)
-            profitable = sum(1 for stock in stocks if self.telegram_bot._calculate_pnl(stock) > 0)
-            
-            summary_message = f"📊 **Daily Summary - {datetime.now().strftime('%m/%d/%Y')}**\n\n"
-            summary_message += f"📈 **Portfolio Status:**\n"
-            summary_message += f"• Total Positions: {total_positions}\n"
-            summary_message += f"• Profitable: {profitable}/{total_positions}\n"
-            summary_message += f"• Win Rate: {(profitable/total_positions)*100:.1f}%\n\n"
-            
-            # Top performers
-            stocks_with_pnl = [(stock, self.telegram_bot._calculate_pnl(stock)) for stock in stocks]
-            stocks_with_pnl.sort(key=lambda x: x[1], reverse=True)
-            
-            if stocks_with_pnl:
-                best_stock, best_pnl = stocks_with_pnl[0]
-                worst_stock, worst_pnl = stocks_with_pnl[-1]
-                
-                summary_message += f"🏆 **Best Performer:** {best_stock.get('Stock Symbol', '')} ({best_pnl:+.1f}%)\n"
-                summary_message += f"📉 **Worst Performer:** {worst_stock.get('Stock Symbol', '')} ({worst_pnl:+.1f}%)\n\n"
-            
-            summary_message += f"🤖 **AI Insights:** Use `/portfolio` for detailed analysis\n"
-            summary_message += f"📱 **Commands:** `/list` to view all positions"
+            # Calculate daily performance with one vectorized pass over the watchlist
+            stats = compute_portfolio_stats(stocks)
+            total_positions = stats.total_positions
+            profitable = stats.winners
+            
+            parts = [
+                f"📊 **Daily Summary - {datetime.now():%m/%d/%Y}**",
+                "",
+                "📈 **Portfolio Status:**",
+                f"• Total Positions: {total_positions}",
+                f"• Profitable: {profitable}/{total_positions}",
+                f"• Win Rate: {stats.win_rate:.1f}%",
+                ""
+            ]
+            
+            # Top performers (rows without both prices have no P&L to rank)
+            if stats.symbols:
+                best, worst = int(stats.pnls.argmax()), int(stats.pnls.argmin())
+                parts += [
+                    f"🏆 **Best Performer:** {stats.symbols[best]} ({stats.pnls[best]:+.1f}%)",
+                    f"📉 **Worst Performer:** {stats.symbols[worst]} ({stats.pnls[worst]:+.1f}%)",
+                    ""
+                ]
+            
+            parts += [
+                "🤖 **AI Insights:** Use `/portfolio` for detailed analysis",
+                "📱 **Commands:** `/list` to view all positions"
+            ]
+            summary_message = "\n".join(parts)
             
             if config.CHAT_ID:
                 await self.telegram_bot.send_alert(config.CHAT_ID, summary_message)
@@ -209,35 +246,6 @@ class StockWatchlistBot:
         except Exception as e:
             logger.error(f"Error generating daily summary: {e}")
 
-    def setup_scheduler(self):
-        """Setup the job scheduler"""
-        try:
-            # Stock monitoring every 5 minutes
-            self.scheduler.add_job(
-                self.monitor_stocks,
-                IntervalTrigger(minutes=config.UPDATE_INTERVAL_MINUTES),
-                id='monitor_stocks',
-                name='Monitor Stock Prices and Alerts',
-                replace_existing=True
-            )
-            
-            # Daily summary at 9 AM EST
-            self.scheduler.add_job(
-                self.daily_summary,
-                'cron',
-                hour=9,
-                minute=0,
-                id='daily_summary',
-                name='Daily Portfolio Summary',
-                replace_existing=True
-            )
-            
-            logger.info("Scheduler setup completed")
-            
-        except Exception as e:
-            logger.error(f"Failed to setup scheduler: {e}")
-            raise
-
     def signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         logger.info(f"Received signal {signum}, shutting down gracefully...")
@@ -262,15 +270,19 @@ class StockWatchlistBot:
             stocks = self.sheets_manager.get_all_stocks()
             logger.info(f"Google Sheets: Connected ({len(stocks)} stocks in watchlist)")
             
-            # Test stock data API with better error handling
+            # Test stock data API with a watchlist symbol so the price lands in the cache
+            probe_symbol = next(
+                (s for s in (str(stock.get('Stock Symbol', '')).strip().upper() for stock in stocks) if s),
+                'RELIANCE'
+            )
             try:
-                test_price = self.stock_analyzer.get_stock_price('AAPL')
+                test_price = self.stock_analyzer.get_stock_price(probe_symbol)
                 if test_price:
-                    logger.info(f"Yahoo Finance API: Connected (AAPL: ${test_price})")
+                    logger.info(f"Stock price API: Connected ({probe_symbol}: ₹{test_price})")
                 else:
-                    logger.warning("Yahoo Finance API: Connected but no price data (may be market hours)")
+                    logger.warning("Stock price API: Connected but no price data (may be market hours)")
             except Exception as e:
-                logger.warning(f"Yahoo Finance API: Issues detected - {e}")
+                logger.warning(f"Stock price API: Issues detected - {e}")
             
             # Test AI service
             if config.GEMINI_API_KEY:
@@ -395,10 +407,10 @@ def main():
         # Create and start bot directly
         bot = TelegramBot()
         
-        logger.info("Starting Telegram bot polling...")
+        logger.info("Starting Telegram bot...")
         
-        # This runs the bot in blocking mode
-        bot.start_polling()
+        # This runs the bot in blocking mode (webhook if WEBHOOK_URL is set, else polling)
+        bot.run()
         
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
@@ -0,0 +1,62 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List
+
+def to_float(value, default: float = 0.0) -> float:
+    """Coerce a sheet cell to float, falling back to default for blanks/garbage"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def pnl_percent(buy: float, cur: float) -> float:
+    """P&L % of one position, 0 unless both prices are known"""
+    return ((cur - buy) / buy * 100.0) if buy > 0 and cur > 0 else 0.0
+
+def column_array(stocks_data: List[Dict], column: str) -> np.ndarray:
+    """One sheet column as a float64 array, blanks/garbage as 0"""
+    return np.fromiter((to_float(stock.get(column, 0)) for stock in stocks_data),
+                       dtype=np.float64, count=len(stocks_data))
+
+def watchlist_columns(stocks_data: List[Dict]) -> Dict[str, np.ndarray]:
+    """Symbols and price columns as parallel arrays, each sheet cell parsed once"""
+    return {
+        # numericise_all turns numeric-looking tickers into ints; symbols are always str here
+        'symbol': np.array([str(stock.get('Stock Symbol', '')).strip() for stock in stocks_data], dtype=object),
+        'buy': column_array(stocks_data, 'Buy Price'),
+        'current': column_array(stocks_data, 'Current Price'),
+        'target': column_array(stocks_data, 'Target Price'),
+        'stop': column_array(stocks_data, 'Stop Loss')
+    }
+
+@dataclass
+class PortfolioStats:
+    symbols: List[str]  # Symbols with both a buy and a current price
+    pnls: np.ndarray  # P&L % aligned with symbols
+    total_positions: int  # All rows, including ones without prices
+    winners: int
+    losers: int
+    avg_pnl: float  # Averaged over total_positions
+    win_rate: float
+
+def compute_portfolio_stats(stocks_data: List[Dict]) -> PortfolioStats:
+    """Compute per-stock P&L and portfolio aggregates in one pass over the watchlist"""
+    total_positions = len(stocks_data)
+    buy = column_array(stocks_data, 'Buy Price')
+    cur = column_array(stocks_data, 'Current Price')
+    
+    # Only rows with both prices count towards P&L
+    mask = (buy > 0) & (cur > 0)
+    pnls = (cur[mask] - buy[mask]) / buy[mask] * 100
+    symbols = [str(stock.get('Stock Symbol', '')).strip() for stock, valid in zip(stocks_data, mask) if valid]
+    winners = int((pnls > 0).sum())
+    
+    return PortfolioStats(
+        symbols=symbols,
+        pnls=pnls,
+        total_positions=total_positions,
+        winners=winners,
+        losers=len(symbols) - winners,
+        avg_pnl=float(pnls.sum()) / total_positions if total_positions else 0.0,
+        win_rate=(winners / total_positions) * 100 if total_positions else 0.0
+    )
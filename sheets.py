@@ -1,18 +1,34 @@
+import asyncio
 import gspread
+from gspread.utils import numericise_all
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 from datetime import datetime
 import logging
-from typing import List, Dict, Optional
+import threading
+import time
+from itertools import groupby
+from typing import List, Dict, Optional, Tuple
 import config
 
 logger = logging.getLogger(__name__)
 
+def _symbol_key(symbol) -> str:
+    """Index key for a symbol; sheet cells may hold ints (numericise_all) or stray spaces"""
+    return str(symbol).strip().upper()
+
 class GoogleSheetsManager:
     def __init__(self):
         self.client = None
         self.sheet = None
         self.worksheet = None
+        self._records_cache: List[Dict] = []
+        self._symbol_to_row: Dict[str, int] = {}  # symbol -> 1-based sheet row
+        self._duplicate_symbols = set()  # Symbols with more than one row; see _rebuild_index
+        self._loaded_at = float('-inf')
+        # gspread is sync and is called from worker threads; hold this across
+        # each sheet RPC and the matching cache/index update
+        self._index_lock = threading.RLock()
         self.connect()
 
     def connect(self):
@@ -36,63 +52,133 @@ class GoogleSheetsManager:
                 self.worksheet = self.sheet.add_worksheet(title="Watchlist", rows="1000", cols="10")
             
             # Initialize headers if sheet is empty
-            if not self.worksheet.get_all_values():
+            values = self.worksheet.get_all_values()
+            if not values:
                 self.worksheet.insert_row(config.STOCK_COLUMNS, 1)
-                
+                values = [config.STOCK_COLUMNS]
+            
+            self._load(values)
             logger.info("Successfully connected to Google Sheets")
             
         except Exception as e:
             logger.error(f"Failed to connect to Google Sheets: {e}")
             raise
 
+    def _load(self, values: Optional[List[List[str]]] = None):
+        """Fetch all rows once and rebuild the records cache and symbol -> row index"""
+        if values is None:
+            values = self.worksheet.get_all_values()
+        header, rows = (values[0], values[1:]) if values else (config.STOCK_COLUMNS, [])
+        width = len(header)
+        self._records_cache = [
+            dict(zip(header, numericise_all(row + [''] * (width - len(row)))))
+            for row in rows
+        ]
+        self._rebuild_index()
+        self._loaded_at = time.monotonic()
+
+    def _rebuild_index(self):
+        """Map each symbol to its first sheet row (row 1 is the header)"""
+        self._symbol_to_row = {}
+        self._duplicate_symbols = set()
+        for i, record in enumerate(self._records_cache, start=2):
+            symbol = _symbol_key(record['Stock Symbol'])
+            if self._symbol_to_row.setdefault(symbol, i) != i:
+                self._duplicate_symbols.add(symbol)
+        if self._duplicate_symbols:
+            logger.warning(f"Duplicate watchlist rows, using the first of each: {', '.join(sorted(self._duplicate_symbols))}")
+
+    def _shift_rows_below(self, deleted_row: int):
+        """Move index entries under a deleted row up by one"""
+        for symbol, row in self._symbol_to_row.items():
+            if row > deleted_row:
+                self._symbol_to_row[symbol] = row - 1
+
+    def _ensure_fresh(self):
+        """Reload the cache once it is older than the TTL"""
+        if time.monotonic() - self._loaded_at > config.SHEETS_CACHE_TTL_SECONDS:
+            self._load()
+
+    def invalidate(self):
+        """Force the next read to refetch the sheet"""
+        self._loaded_at = float('-inf')
+
     def add_stock(self, symbol: str, buy_price: float, target_price: float, 
-                  stop_loss: float, notes: str = "") -> bool:
+                  stop_loss: float, notes: str = "", current_price: float = 0) -> bool:
         """Add a new stock to the watchlist"""
+        return self.add_stocks([(symbol, buy_price, target_price, stop_loss, notes, current_price)])
+
+    def add_stocks(self, stocks: List[Tuple[str, float, float, float, str, float]]) -> bool:
+        """Add several stocks with one append_rows call.
+
+        Each entry is (symbol, buy_price, target_price, stop_loss, notes, current_price).
+        """
         try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            row_data = [
-                symbol.upper(),
-                buy_price,
-                target_price,
-                stop_loss,
-                0,  # Current price - will be updated by price fetcher
-                notes,
-                current_time,
-                current_time
-            ]
-            
-            self.worksheet.append_row(row_data)
-            logger.info(f"Added stock {symbol} to watchlist")
-            return True
-            
+            with self._index_lock:
+                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                rows = [
+                    [_symbol_key(symbol), buy_price, target_price, stop_loss,
+                     current_price,  # 0 until the price fetcher fills it in
+                     notes, current_time, current_time]
+                    for symbol, buy_price, target_price, stop_loss, notes, current_price in stocks
+                ]
+                
+                # Refresh before writing so a reload can't pick up and duplicate the new rows
+                self._ensure_fresh()
+                
+                # Symbols already on the sheet are left as they are
+                existing = [row[0] for row in rows if row[0] in self._symbol_to_row]
+                if existing:
+                    logger.warning(f"Already in watchlist, not adding again: {', '.join(existing)}")
+                    rows = [row for row in rows if row[0] not in self._symbol_to_row]
+                if not rows:
+                    return True
+                
+                self.worksheet.append_rows(rows)
+                for row_data in rows:
+                    self._records_cache.append(dict(zip(config.STOCK_COLUMNS, row_data)))
+                    self._symbol_to_row[row_data[0]] = len(self._records_cache) + 1
+                logger.info(f"Added {', '.join(row[0] for row in rows)} to watchlist")
+                return True
+                
         except Exception as e:
-            logger.error(f"Failed to add stock {symbol}: {e}")
+            logger.error(f"Failed to add stocks {[entry[0] for entry in stocks]}: {e}")
+            self.invalidate()
             return False
 
     def remove_stock(self, symbol: str) -> bool:
         """Remove a stock from the watchlist"""
         try:
-            symbol = symbol.upper()
-            all_records = self.worksheet.get_all_records()
-            
-            for i, record in enumerate(all_records, start=2):  # Start from row 2 (after header)
-                if record['Stock Symbol'] == symbol:
-                    self.worksheet.delete_rows(i)
-                    logger.info(f"Removed stock {symbol} from watchlist")
-                    return True
-            
-            logger.warning(f"Stock {symbol} not found in watchlist")
-            return False
-            
+            with self._index_lock:
+                symbol = _symbol_key(symbol)
+                self._ensure_fresh()
+                row = self._symbol_to_row.pop(symbol, None)
+                
+                if row is None:
+                    logger.warning(f"Stock {symbol} not found in watchlist")
+                    return False
+                
+                self.worksheet.delete_rows(row)
+                del self._records_cache[row - 2]
+                if symbol in self._duplicate_symbols:
+                    self._rebuild_index()  # Another row for the symbol is still on the sheet
+                else:
+                    self._shift_rows_below(row)
+                logger.info(f"Removed stock {symbol} from watchlist")
+                return True
+                
         except Exception as e:
             logger.error(f"Failed to remove stock {symbol}: {e}")
+            self.invalidate()
             return False
 
     def get_all_stocks(self) -> List[Dict]:
         """Get all stocks from the watchlist"""
         try:
-            records = self.worksheet.get_all_records()
-            return records
+            with self._index_lock:
+                self._ensure_fresh()
+                # Copies, so callers can't change the cache outside the lock
+                return [dict(record) for record in self._records_cache]
         except Exception as e:
             logger.error(f"Failed to get stocks: {e}")
             return []
@@ -100,19 +186,26 @@ class GoogleSheetsManager:
     def update_current_price(self, symbol: str, current_price: float) -> bool:
         """Update the current price of a stock"""
         try:
-            symbol = symbol.upper()
-            all_records = self.worksheet.get_all_records()
-            
-            for i, record in enumerate(all_records, start=2):
-                if record['Stock Symbol'] == symbol:
-                    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self.worksheet.update_cell(i, 5, current_price)  # Current Price column
-                    self.worksheet.update_cell(i, 8, current_time)   # Last Updated column
-                    return True
-            
-            logger.warning(f"Stock {symbol} not found for price update")
-            return False
-            
+            with self._index_lock:
+                symbol = _symbol_key(symbol)
+                self._ensure_fresh()
+                row = self._symbol_to_row.get(symbol)
+                
+                if row is None:
+                    logger.warning(f"Stock {symbol} not found for price update")
+                    return False
+                
+                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                # USER_ENTERED is what the two update_cell calls this replaces sent
+                self.worksheet.batch_update([
+                    {'range': f'E{row}', 'values': [[current_price]]},  # Current Price column
+                    {'range': f'H{row}', 'values': [[current_time]]}    # Last Updated column
+                ], value_input_option='USER_ENTERED')
+                record = self._records_cache[row - 2]
+                record['Current Price'] = current_price
+                record['Last Updated'] = current_time
+                return True
+                
         except Exception as e:
             logger.error(f"Failed to update price for {symbol}: {e}")
             return False
@@ -120,15 +213,12 @@ class GoogleSheetsManager:
     def get_stock_by_symbol(self, symbol: str) -> Optional[Dict]:
         """Get a specific stock by symbol"""
         try:
-            symbol = symbol.upper()
-            records = self.get_all_stocks()
-            
-            for record in records:
-                if record['Stock Symbol'] == symbol:
-                    return record
-            
-            return None
-            
+            with self._index_lock:
+                symbol = _symbol_key(symbol)
+                self._ensure_fresh()
+                row = self._symbol_to_row.get(symbol)
+                return dict(self._records_cache[row - 2]) if row is not None else None
+                
         except Exception as e:
             logger.error(f"Failed to get stock {symbol}: {e}")
             return None
@@ -136,28 +226,49 @@ class GoogleSheetsManager:
     def bulk_update_prices(self, price_updates: Dict[str, float]) -> bool:
         """Update multiple stock prices at once"""
         try:
-            all_records = self.worksheet.get_all_records()
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            updates = []
-            for i, record in enumerate(all_records, start=2):
-                symbol = record['Stock Symbol']
-                if symbol in price_updates:
+            with self._index_lock:
+                self._ensure_fresh()
+                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                
+                row_prices = {}
+                for symbol, price in price_updates.items():
+                    row = self._symbol_to_row.get(_symbol_key(symbol))
+                    if row is not None:
+                        row_prices[row] = price
+                
+                # One E range and one H range per run of consecutive rows
+                updates = []
+                rows = sorted(row_prices)
+                for _, run in groupby(enumerate(rows), key=lambda pair: pair[1] - pair[0]):
+                    run_rows = [row for _, row in run]
+                    lo, hi = run_rows[0], run_rows[-1]
                     updates.append({
-                        'range': f'E{i}',  # Current Price column
-                        'values': [[price_updates[symbol]]]
+                        'range': f'E{lo}:E{hi}',  # Current Price column
+                        'values': [[row_prices[row]] for row in run_rows]
                     })
                     updates.append({
-                        'range': f'H{i}',  # Last Updated column
-                        'values': [[current_time]]
+                        'range': f'H{lo}:H{hi}',  # Last Updated column
+                        'values': [[current_time]] * len(run_rows)
                     })
-            
-            if updates:
-                self.worksheet.batch_update(updates)
-                logger.info(f"Updated prices for {len(price_updates)} stocks")
                 
-            return True
-            
+                if updates:
+                    self.worksheet.batch_update(updates)  # RAW, gspread's default, as before
+                    for row, price in row_prices.items():
+                        record = self._records_cache[row - 2]
+                        record['Current Price'] = price
+                        record['Last Updated'] = current_time
+                    logger.info(f"Updated prices for {len(price_updates)} stocks")
+                    
+                return True
+                
         except Exception as e:
             logger.error(f"Failed to bulk update prices: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    async def get_all_stocks_async(self) -> List[Dict]:
+        """get_all_stocks without blocking the event loop"""
+        return await asyncio.to_thread(self.get_all_stocks)
+
+    async def bulk_update_prices_async(self, price_updates: Dict[str, float]) -> bool:
+        """bulk_update_prices without blocking the event loop"""
+        return await asyncio.to_thread(self.bulk_update_prices, price_updates)
\ No newline at end of file
@@ -1,20 +1,234 @@
+import asyncio
+import functools
+import aiohttp
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
-import ta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import time
 import re
-import investpy
-import yfinance as yf  # Only for historical data
+from operator import itemgetter
+import yfinance as yf  # Only for news
+from cache import TokenBucket, ttl_cache
+import config
+from indicators_jit import ema_last, macd_last, rsi_last
 
 logger = logging.getLogger(__name__)
 
+_BREAKER_THRESHOLD = 3  # Consecutive failures before a source is skipped
+_BREAKER_COOLDOWN_SECONDS = 30
+
+_NSE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    "Accept-Language": "en-US,en;q=0.9"
+}
+_HTML_HEADERS = {"User-Agent": "Mozilla/5.0"}  # Google Finance / Moneycontrol pages
+
+_NSE_HOME = "https://www.nseindia.com"
+_NSE_REWARM_SECONDS = 600  # NSE cookies expire; revisit the homepage this often
+_NSE_AUTH_ERRORS = (401, 403)  # NSE's answer to missing or expired cookies
+
+# Per-symbol URL builders; only the symbol varies between requests
+_NSE_QUOTE_URL = "https://www.nseindia.com/api/quote-equity?symbol={}".format
+_NSE_REFERER = "https://www.nseindia.com/get-quotes/equity?symbol={}".format
+_GFINANCE_URL = "https://www.google.com/finance/quote/{}:NSE".format
+_MC_URL = "https://www.moneycontrol.com/india/stockpricequote/{}".format
+
+def compute_indicators(close: np.ndarray) -> Dict:
+    """Pure CPU part of the technical analysis; module-level so it can run in a worker process"""
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    indicators = {}
+    
+    # RSI (Wilder's smoothing, 14)
+    indicators['rsi'] = rsi_last(close, 14)
+    
+    # MACD (12/26/9)
+    indicators['macd'], indicators['macd_signal'] = macd_last(close, 12, 26, 9)
+    
+    # Bollinger Bands (20, 2σ) - only the last window is needed
+    window = close[-20:]
+    mavg, mstd = window.mean(), window.std()
+    indicators['bb_upper'] = mavg + 2 * mstd
+    indicators['bb_lower'] = mavg - 2 * mstd
+    current_price = close[-1]
+    indicators['bb_position'] = (current_price - indicators['bb_lower']) / (indicators['bb_upper'] - indicators['bb_lower'])
+    
+    # Moving Averages
+    indicators['ema_50'] = ema_last(close, 50)
+    indicators['ema_200'] = ema_last(close, min(200, len(close)))
+    
+    indicators['current_price'] = current_price
+    
+    return indicators
+
+def _nse_last_price(data: Dict) -> float:
+    """Last traded price from an NSE quote-equity payload"""
+    return float(data["priceInfo"]["lastPrice"])
+
+# Thousands separators, the rupee sign and whitespace, dropped in one pass
+_PRICE_TRANS = str.maketrans('', '', ',\u20b9 \t\n\r')
+
+_GFINANCE_RE = re.compile(rb'class="YMlKec fxKbKc"[^>]*>([^<]+)<')
+_MC_RE = re.compile(rb'id="Nse_Prc_tick"[^>]*>\s*(?:<[^>]*>\s*)*([\d,.]+)')
+
+def _google_finance_price(html: bytes) -> Optional[float]:
+    """Price from a Google Finance quote page, or None if the tag is missing"""
+    match = _GFINANCE_RE.search(html)
+    if not match:
+        return None
+    return float(match.group(1).decode().translate(_PRICE_TRANS))
+
+def _moneycontrol_price(html: bytes) -> Optional[float]:
+    """Price from a Moneycontrol quote page, or None if the tag is missing"""
+    match = _MC_RE.search(html)
+    if not match:
+        return None
+    return float(match.group(1).decode().translate(_PRICE_TRANS))
+
+# Map period to actual date ranges
+_PERIOD_DAYS = {
+    "1mo": 30,
+    "3mo": 90,
+    "6mo": 180,
+    "1y": 365
+}
+
+# NSE historical API field -> conventional OHLCV column
+_NSE_HISTORY_COLUMNS = {
+    'CH_TIMESTAMP': 'Date',
+    'CH_OPENING_PRICE': 'Open',
+    'CH_TRADE_HIGH_PRICE': 'High',
+    'CH_TRADE_LOW_PRICE': 'Low',
+    'CH_CLOSING_PRICE': 'Close',
+    'CH_TOT_TRADED_QTY': 'Volume'
+}
+
+# yfinance news fields we keep, with the fallbacks used when a field is missing
+_NEWS_DEFAULTS = {'title': '', 'publisher': '', 'providerPublishTime': 0}
+_NEWS_FIELDS = itemgetter(*_NEWS_DEFAULTS)
+
+def _news_row(item: Dict) -> Tuple:
+    """(title, publisher, providerPublishTime) of a news item"""
+    try:
+        return _NEWS_FIELDS(item)
+    except KeyError:
+        return tuple(item.get(key, default) for key, default in _NEWS_DEFAULTS.items())
+
+_IST_OFFSET = 19800  # UTC+5:30 in seconds
+_MARKET_OPEN = 9 * 3600 + 15 * 60  # 9:15 AM, seconds after IST midnight
+_MARKET_CLOSE = 15 * 3600 + 30 * 60  # 3:30 PM
+
+def market_open_at(ts: float) -> bool:
+    """Whether NSE is in regular trading hours at epoch ts, independent of the host timezone"""
+    day, seconds = divmod(int(ts) + _IST_OFFSET, 86400)
+    # 1970-01-01 was a Thursday, so (day + 3) % 7 is the weekday with Monday = 0
+    return (day + 3) % 7 < 5 and _MARKET_OPEN <= seconds <= _MARKET_CLOSE
+
+_PRICE_SLOTS = 8192  # Initial price-cache capacity; doubles when every slot is live
+_PRICE_FRESH_SECONDS = 300
+_PRICE_STALE_SECONDS = 1800
+_NSE_FAST_TIMEOUT_SECONDS = 3  # NSE-only attempt for symbols NSE has served before
+
 class StockAnalyzer:
     def __init__(self):
-        self.cache = {}
+        # Price cache as parallel arrays indexed by symbol slot. Prices are fresh
+        # for 5 minutes; stale ones are still served for 30 while refreshing
+        self._sym_idx: Dict[str, int] = {}
+        self._prices = np.full(_PRICE_SLOTS, np.nan)
+        self._fetched_at = np.full(_PRICE_SLOTS, -np.inf)  # time.monotonic() of the fetch
+        self._cache_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="price-refresh")
+        self._http: Optional[aiohttp.ClientSession] = None  # See _get_http
+        self._http_warmed_at = -np.inf  # See _warm_nse_async
+        self._http_warm_lock = asyncio.Lock()
+        
+        # One keep-alive session for the sync price path, shared by all three providers
+        self.session = requests.Session()
+        self.session.headers.update(_NSE_HEADERS)  # Defaults, like the aiohttp session; pages override the UA
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 502, 503])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._nse_warmed_at = -np.inf  # time.monotonic() of the last successful warm-up
+        self._nse_warm_lock = threading.Lock()
+        # Daily bars memoized per (symbol, period, day); see get_historical_data
+        self._historical_data_cached = functools.lru_cache(maxsize=512)(self._fetch_historical_data)
+        self._rate_limiter = TokenBucket(config.PRICE_LOOKUPS_PER_SECOND)
+        # Per-source circuit breakers: source -> [consecutive failures, skip until (monotonic)]
+        self._breakers = {source: [0, 0.0] for source in ("NSE", "Google Finance", "Moneycontrol")}
+        # Symbols NSE has answered for; bulk refreshes try NSE alone for these first
+        self._nse_ok = set()
+
+    def _warm_nse(self, since: Optional[float] = None):
+        """Visit the NSE homepage so the session holds the cookies its API expects.
+
+        Re-warms every _NSE_REWARM_SECONDS, or when the cookies predate since
+        (the time of a request NSE rejected).
+        """
+        if since is None and time.monotonic() - self._nse_warmed_at < _NSE_REWARM_SECONDS:
+            return
+        with self._nse_warm_lock:
+            # Another thread may have warmed up while this one waited
+            if since is None and time.monotonic() - self._nse_warmed_at < _NSE_REWARM_SECONDS:
+                return
+            if since is not None and self._nse_warmed_at > since:
+                return
+            try:
+                self.session.get(_NSE_HOME, timeout=5).raise_for_status()
+                self._nse_warmed_at = time.monotonic()
+            except Exception as e:
+                logger.debug(f"NSE cookie warm-up failed: {e}")
+
+    def _nse_get(self, url: str, symbol: str) -> requests.Response:
+        """GET an NSE API url with warm cookies, re-warming once if NSE rejects them"""
+        self._warm_nse()
+        sent_at = time.monotonic()
+        response = self.session.get(url, headers={"Referer": _NSE_REFERER(symbol)}, timeout=10)
+        if response.status_code in _NSE_AUTH_ERRORS:
+            self._warm_nse(since=sent_at)
+            response = self.session.get(url, headers={"Referer": _NSE_REFERER(symbol)}, timeout=10)
+        response.raise_for_status()
+        return response
+
+    async def _warm_nse_async(self, http: aiohttp.ClientSession, since: Optional[float] = None):
+        """_warm_nse for the aiohttp session, whose cookie jar is separate"""
+        if since is None and time.monotonic() - self._http_warmed_at < _NSE_REWARM_SECONDS:
+            return
+        async with self._http_warm_lock:
+            if since is None and time.monotonic() - self._http_warmed_at < _NSE_REWARM_SECONDS:
+                return
+            if since is not None and self._http_warmed_at > since:
+                return
+            try:
+                async with http.get(_NSE_HOME, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    response.raise_for_status()
+                self._http_warmed_at = time.monotonic()
+            except Exception as e:
+                logger.debug(f"NSE cookie warm-up (async) failed: {e}")
+
+    async def _get_nse_quote(self, symbol: str, http: aiohttp.ClientSession,
+                             timeout: Optional[aiohttp.ClientTimeout] = None) -> Optional[float]:
+        """NSE quote over the aiohttp session; a cookie rejection re-warms for the next call"""
+        await self._warm_nse_async(http)
+        sent_at = time.monotonic()
+        extra = {"timeout": timeout} if timeout is not None else {}  # Else the session default
+        async with http.get(_NSE_QUOTE_URL(symbol), headers={"Referer": _NSE_REFERER(symbol)},
+                            **extra) as response:
+            if response.status in _NSE_AUTH_ERRORS:
+                await self._warm_nse_async(http, since=sent_at)
+            response.raise_for_status()
+            return _nse_last_price(orjson.loads(await response.read()))
         
     def get_stock_price(self, symbol: str) -> Optional[float]:
         """
@@ -25,111 +239,317 @@ class StockAnalyzer:
         """
         symbol = symbol.upper().replace('.NS', '').replace('.BO', '')
         
-        # Check cache (5-minute cache)
-        cache_key = f"{symbol}_{int(time.time() // 300)}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-
-        # ---------------- NSE API ----------------
-        try:
-            url = f"https://www.nseindia.com/api/quote-equity?symbol={symbol}"
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": f"https://www.nseindia.com/get-quotes/equity?symbol={symbol}"
-            }
-            session = requests.Session()
-            response = session.get(url, headers=headers, timeout=10)
-            data = response.json()
-            price = float(data["priceInfo"]["lastPrice"])
-            
-            # Cache and return
-            self.cache[cache_key] = price
-            logger.info(f"NSE: {symbol} = ₹{price}")
+        # Check cache; a stale hit is returned now and refreshed in the background
+        price, fresh = self._lookup_price(symbol)
+        if price is not None:
+            if not fresh:
+                self._refresh_in_background(symbol)
             return price
-            
-        except Exception as e:
-            logger.debug(f"NSE failed for {symbol}: {e}")
+        return self._fetch_price(symbol)
 
-        # ---------------- Google Finance ----------------
-        try:
-            url = f"https://www.google.com/finance/quote/{symbol}:NSE"
-            headers = {"User-Agent": "Mozilla/5.0"}
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.text, "html.parser")
-            price_tag = soup.find("div", class_="YMlKec fxKbKc")
-            if price_tag:
-                price_text = price_tag.text.replace(",", "").replace("₹", "").strip()
-                price = float(price_text)
+    def _lookup_price(self, symbol: str, max_age: Optional[float] = None) -> Tuple[Optional[float], bool]:
+        """(price, is_fresh) from the cache, or (None, False) on a miss.
+
+        With max_age, only prices younger than that count and stale ones are a miss.
+        """
+        with self._cache_lock:
+            idx = self._sym_idx.get(symbol)
+            if idx is None:
+                return None, False
+            price, age = self._prices[idx], time.monotonic() - self._fetched_at[idx]
+        if max_age is not None:
+            return (float(price), True) if age < max_age else (None, False)
+        if age < _PRICE_FRESH_SECONDS:
+            return float(price), True
+        if age < _PRICE_STALE_SECONDS:
+            return float(price), False
+        return None, False
+
+    def _fresh_prices(self, symbols: List[str], max_age: float = _PRICE_FRESH_SECONDS) -> Dict[str, float]:
+        """Cached prices younger than max_age for many symbols in one vectorized age check"""
+        with self._cache_lock:
+            known = [symbol for symbol in symbols if symbol in self._sym_idx]
+            idx = np.fromiter((self._sym_idx[symbol] for symbol in known), dtype=np.intp, count=len(known))
+            fresh = time.monotonic() - self._fetched_at[idx] < max_age
+            prices = self._prices[idx]
+        return {known[i]: float(prices[i]) for i in np.flatnonzero(fresh)}
+
+    def _store_price(self, symbol: str, price: float):
+        """Record a freshly fetched price"""
+        with self._cache_lock:
+            idx = self._sym_idx.get(symbol)
+            if idx is None:
+                if len(self._sym_idx) == len(self._prices):
+                    self._compact_prices()
+                idx = self._sym_idx[symbol] = len(self._sym_idx)
+            self._prices[idx] = price
+            self._fetched_at[idx] = time.monotonic()
+
+    def _compact_prices(self):
+        """Drop expired slots in one sweep, growing the arrays if everything is still live"""
+        keep = np.flatnonzero(time.monotonic() - self._fetched_at < _PRICE_STALE_SECONDS)
+        symbols = list(self._sym_idx)  # Slots are handed out in insertion order
+        size = len(self._prices) * (2 if len(keep) == len(self._prices) else 1)
+        
+        prices = np.full(size, np.nan)
+        fetched_at = np.full(size, -np.inf)
+        prices[:len(keep)] = self._prices[keep]
+        fetched_at[:len(keep)] = self._fetched_at[keep]
+        self._prices, self._fetched_at = prices, fetched_at
+        self._sym_idx = {symbols[old]: new for new, old in enumerate(keep)}
+
+    def _refresh_in_background(self, symbol: str):
+        """Refetch a stale price on the refresh pool, at most once at a time per symbol"""
+        with self._cache_lock:
+            if symbol in self._refreshing:
+                return
+            self._refreshing.add(symbol)
+        
+        def _refresh():
+            try:
+                self._fetch_price(symbol)
+            finally:
+                with self._cache_lock:
+                    self._refreshing.discard(symbol)
+        
+        self._refresh_pool.submit(_refresh)
+
+    def _source_available(self, source: str) -> bool:
+        """False while the source's circuit breaker is open"""
+        return time.monotonic() >= self._breakers[source][1]
+
+    def _source_succeeded(self, source: str):
+        """Reset the failure count after a good response"""
+        self._breakers[source][0] = 0
+
+    def _source_failed(self, source: str):
+        """Count a failure; after _BREAKER_THRESHOLD in a row, skip the source for a while"""
+        state = self._breakers[source]
+        state[0] += 1
+        if state[0] >= _BREAKER_THRESHOLD:
+            state[0] = 0
+            state[1] = time.monotonic() + _BREAKER_COOLDOWN_SECONDS
+            logger.warning(f"{source} keeps failing, skipping it for {_BREAKER_COOLDOWN_SECONDS}s")
+
+    def _fetch_price(self, symbol: str) -> Optional[float]:
+        """Walk the NSE -> Google Finance -> Moneycontrol chain and cache the first hit"""
+        self._rate_limiter.acquire()  # Throttle symbol lookups without serializing them
+        
+        # ---------------- NSE API ----------------
+        if self._source_available("NSE"):
+            try:
+                response = self._nse_get(_NSE_QUOTE_URL(symbol), symbol)
+                price = _nse_last_price(orjson.loads(response.content))
+                self._source_succeeded("NSE")
+                self._nse_ok.add(symbol)
                 
                 # Cache and return
-                self.cache[cache_key] = price
-                logger.info(f"Google Finance: {symbol} = ₹{price}")
+                self._store_price(symbol, price)
+                logger.info(f"NSE: {symbol} = ₹{price}")
                 return price
                 
-        except Exception as e:
-            logger.debug(f"Google Finance failed for {symbol}: {e}")
+            except Exception as e:
+                self._source_failed("NSE")
+                logger.debug(f"NSE failed for {symbol}: {e}")
+
+        # ---------------- Google Finance ----------------
+        if self._source_available("Google Finance"):
+            try:
+                response = self.session.get(_GFINANCE_URL(symbol), headers=_HTML_HEADERS, timeout=10)
+                price = _google_finance_price(response.content)
+                self._source_succeeded("Google Finance")
+                if price is not None:
+                    # Cache and return
+                    self._store_price(symbol, price)
+                    logger.info(f"Google Finance: {symbol} = ₹{price}")
+                    return price
+                    
+            except Exception as e:
+                self._source_failed("Google Finance")
+                logger.debug(f"Google Finance failed for {symbol}: {e}")
 
         # ---------------- Moneycontrol ----------------
-        try:
-            url = f"https://www.moneycontrol.com/india/stockpricequote/{symbol.lower()}"
-            headers = {"User-Agent": "Mozilla/5.0"}
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.text, "html.parser")
-            price_tag = soup.find("div", {"id": "Nse_Prc_tick"})
-            if price_tag:
-                price = float(price_tag.text.strip().replace(",", ""))
-                
-                # Cache and return
-                self.cache[cache_key] = price
-                logger.info(f"Moneycontrol: {symbol} = ₹{price}")
-                return price
-                
-        except Exception as e:
-            logger.debug(f"Moneycontrol failed for {symbol}: {e}")
+        if self._source_available("Moneycontrol"):
+            try:
+                response = self.session.get(_MC_URL(symbol.lower()), headers=_HTML_HEADERS, timeout=10)
+                price = _moneycontrol_price(response.content)
+                self._source_succeeded("Moneycontrol")
+                if price is not None:
+                    # Cache and return
+                    self._store_price(symbol, price)
+                    logger.info(f"Moneycontrol: {symbol} = ₹{price}")
+                    return price
+                    
+            except Exception as e:
+                self._source_failed("Moneycontrol")
+                logger.debug(f"Moneycontrol failed for {symbol}: {e}")
 
         logger.warning(f"All sources failed for {symbol}")
         return None
 
     def bulk_get_prices(self, symbols: List[str]) -> Dict[str, float]:
-        """Get prices for multiple stocks"""
+        """Get prices for multiple stocks (for callers outside the event loop)"""
         prices = {}
-        for symbol in symbols:
-            price = self.get_stock_price(symbol)
-            if price:
-                prices[symbol] = price
-            time.sleep(1)  # Rate limiting
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix="prices") as pool:
+            futures = {pool.submit(self.get_stock_price, symbol): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                price = future.result()
+                if price:
+                    prices[futures[future]] = price
         return prices
 
-    
+    @staticmethod
+    def _new_http() -> aiohttp.ClientSession:
+        """Keep-alive session; NSE headers are the defaults so its cookie jar is reused"""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, limit_per_host=4, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=10),
+            headers=_NSE_HEADERS
+        )
 
-    def get_historical_data(self, symbol: str, period: str = "3mo") -> Optional[pd.DataFrame]:
-        """Get historical data using investpy (instead of yfinance)"""
+    def _get_http(self) -> aiohttp.ClientSession:
+        """Shared session, created lazily inside the running event loop"""
+        if self._http is None or self._http.closed:
+            self._http = self._new_http()
+            self._http_warmed_at = -np.inf  # A new session starts with an empty cookie jar
+        return self._http
+
+    async def close(self):
+        """Close the shared aiohttp session"""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+
+    async def get_stock_price_async(self, symbol: str,
+                                    http: Optional[aiohttp.ClientSession] = None,
+                                    max_age: Optional[float] = None) -> Optional[float]:
+        """Async get_stock_price over a keep-alive session (same fallbacks and cache).
+
+        max_age: only reuse cached prices younger than this, never serving stale ones.
+        """
+        symbol = symbol.upper().replace('.NS', '').replace('.BO', '')
+        
+        price, fresh = self._lookup_price(symbol, max_age)
+        if price is not None:
+            if not fresh:
+                self._refresh_in_background(symbol)
+            return price
+        
+        http = http or self._get_http()
+        
+        async def _page(url, parse):
+            async with http.get(url, headers=_HTML_HEADERS) as response:
+                return parse(await response.read())
+        
+        # All available sources go out in one wave; results are taken in priority order
+        candidates = (
+            ("NSE", lambda: self._get_nse_quote(symbol, http)),
+            ("Google Finance", lambda: _page(_GFINANCE_URL(symbol), _google_finance_price)),
+            ("Moneycontrol", lambda: _page(_MC_URL(symbol.lower()), _moneycontrol_price)),
+        )
+        sources = [
+            (source, asyncio.ensure_future(fetch()))
+            for source, fetch in candidates if self._source_available(source)
+        ]
         try:
-            # Map period to actual date ranges
-            period_map = {
-                "1mo": 30,
-                "3mo": 90,
-                "6mo": 180,
-                "1y": 365
-            }
-            days = period_map.get(period, 90)
-
-            # Fetch data from NSE
-            data = investpy.get_stock_historical_data(
-                stock=symbol,
-                country="India",
-                from_date=(datetime.now() - pd.Timedelta(days=days)).strftime("%d/%m/%Y"),
-                to_date=datetime.now().strftime("%d/%m/%Y")
-            )
-
-            return data if not data.empty else None
+            for source, task in sources:
+                try:
+                    price = await task
+                except Exception as e:
+                    self._source_failed(source)
+                    logger.debug(f"{source} failed for {symbol}: {e}")
+                    continue
+                self._source_succeeded(source)
+                if price is not None:
+                    if source == "NSE":
+                        self._nse_ok.add(symbol)
+                    self._store_price(symbol, price)
+                    logger.info(f"{source}: {symbol} = ₹{price}")
+                    return price
+        finally:
+            for _, task in sources:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Mark lower-priority failures as retrieved
+
+        logger.warning(f"All sources failed for {symbol}")
+        return None
 
+    async def _get_price_nse_only(self, symbol: str, http: aiohttp.ClientSession) -> Optional[float]:
+        """NSE-only lookup for known-good symbols; a miss demotes the symbol to the full chain"""
+        if not self._source_available("NSE"):
+            return None
+        try:
+            price = await self._get_nse_quote(
+                symbol, http, aiohttp.ClientTimeout(total=_NSE_FAST_TIMEOUT_SECONDS))
+        except Exception as e:
+            self._source_failed("NSE")
+            self._nse_ok.discard(symbol)
+            logger.debug(f"NSE fast path failed for {symbol}: {e}")
+            return None
+        
+        self._source_succeeded("NSE")
+        self._store_price(symbol, price)
+        logger.info(f"NSE: {symbol} = ₹{price}")
+        return price
+
+    async def bulk_get_prices_async(self, symbols: List[str],
+                                    http: Optional[aiohttp.ClientSession] = None,
+                                    max_age: Optional[float] = None) -> Dict[str, float]:
+        """Get prices for multiple stocks concurrently, a few symbols in flight at a time.
+
+        max_age: refetch anything older than this; stale prices are never returned.
+        """
+        prices = self._fresh_prices(symbols, _PRICE_FRESH_SECONDS if max_age is None else max_age)
+        pending = [symbol for symbol in symbols if symbol not in prices]
+        sem = asyncio.Semaphore(4)  # Polite per-host concurrency instead of sleep(1) per symbol
+        http = http or self._get_http()
+        
+        async def _one(symbol):
+            async with sem:
+                if symbol in self._nse_ok:
+                    price = await self._get_price_nse_only(symbol, http)
+                    if price is not None:
+                        return price
+                return await self.get_stock_price_async(symbol, http, max_age)
+        
+        results = await asyncio.gather(*(_one(symbol) for symbol in pending))
+        prices.update((symbol, price) for symbol, price in zip(pending, results) if price)
+        return prices
+
+    def get_historical_data(self, symbol: str, period: str = "3mo") -> Optional[pd.DataFrame]:
+        """Get historical data from NSE's historical equity API, memoized per day"""
+        try:
+            return self._historical_data_cached(symbol, period, datetime.now().strftime("%Y-%m-%d"))
         except Exception as e:
             logger.error(f"Historical data failed for {symbol}: {e}")
             return None
+
+    def _fetch_historical_data(self, symbol: str, period: str, day: str) -> pd.DataFrame:
+        """Daily bars for symbol up to day; raises on failure so misses aren't memoized.
+
+        Callers share the returned DataFrame and must not mutate it.
+        """
+        days = _PERIOD_DAYS.get(period, 90)
+        to_date = datetime.strptime(day, "%Y-%m-%d")
+        from_date = to_date - pd.Timedelta(days=days)
+        
+        url = (
+            f"https://www.nseindia.com/api/historical/cm/equity?symbol={symbol}"
+            f"&series=[%22EQ%22]&from={from_date:%d-%m-%Y}&to={to_date:%d-%m-%Y}"
+        )
+        response = self._nse_get(url, symbol)
+        
+        rows = orjson.loads(response.content).get('data') or []
+        if not rows:
+            raise ValueError("no rows returned")
+        
+        data = pd.DataFrame(rows)[list(_NSE_HISTORY_COLUMNS)].rename(columns=_NSE_HISTORY_COLUMNS)
+        data['Date'] = pd.to_datetime(data['Date'])
+        return data.set_index('Date').sort_index()  # NSE returns newest first
     
     
+    @ttl_cache(ttl=240, maxsize=512)
     def calculate_technical_indicators(self, symbol: str) -> Dict:
         """Calculate technical indicators"""
         try:
@@ -137,35 +557,20 @@ class StockAnalyzer:
             if data is None or len(data) < 50:
                 return {}
 
-            indicators = {}
-            
-            # RSI
-            indicators['rsi'] = ta.momentum.RSIIndicator(close=data['Close']).rsi().iloc[-1]
-            
-            # MACD
-            macd = ta.trend.MACD(close=data['Close'])
-            indicators['macd'] = macd.macd().iloc[-1]
-            indicators['macd_signal'] = macd.macd_signal().iloc[-1]
-            
-            # Bollinger Bands
-            bollinger = ta.volatility.BollingerBands(close=data['Close'])
-            indicators['bb_upper'] = bollinger.bollinger_hband().iloc[-1]
-            indicators['bb_lower'] = bollinger.bollinger_lband().iloc[-1]
-            current_price = data['Close'].iloc[-1]
-            indicators['bb_position'] = (current_price - indicators['bb_lower']) / (indicators['bb_upper'] - indicators['bb_lower'])
-            
-            # Moving Averages
-            indicators['ema_50'] = ta.trend.EMAIndicator(close=data['Close'], window=50).ema_indicator().iloc[-1]
-            indicators['ema_200'] = ta.trend.EMAIndicator(close=data['Close'], window=min(200, len(data))).ema_indicator().iloc[-1]
-            
-            indicators['current_price'] = current_price
-            
-            return indicators
+            # pandas stops at the get_historical_data boundary; the kernels take a plain array
+            return compute_indicators(data['Close'].to_numpy(dtype=np.float64))
             
         except Exception as e:
             logger.error(f"Technical indicators failed for {symbol}: {e}")
             return {}
 
+    def calculate_technical_indicators_bulk(self, symbols: List[str],
+                                            max_workers: int = config.INDICATOR_CONCURRENCY) -> Dict[str, Dict]:
+        """Indicators for many symbols; history downloads overlap, memoized symbols return at once"""
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="indicators") as pool:
+            results = pool.map(self.calculate_technical_indicators, symbols)
+            return {symbol: indicators for symbol, indicators in zip(symbols, results) if indicators}
+
     def generate_technical_analysis(self, symbol: str) -> str:
         """Generate technical analysis report"""
         try:
@@ -216,9 +621,17 @@ class StockAnalyzer:
             analysis += f"💰 Price: ₹{current_price:.2f}\n\n"
             analysis += "\n".join(f"• {signal}" for signal in signals)
             
-            # Overall recommendation
-            buy_count = sum(1 for s in signals if 'buy' in s.lower() or 'bullish' in s.lower())
-            sell_count = sum(1 for s in signals if 'sell' in s.lower() or 'bearish' in s.lower())
+            # Overall recommendation: +1 buy / -1 sell / 0 neutral per signal above.
+            # Indicators are np.float64, whose comparisons give np.bool_, which can't
+            # be subtracted; cast them to int first
+            scores = np.array([
+                int(rsi < 30) - int(rsi > 70),
+                np.where(macd > macd_signal, 1, -1),
+                int(bb_position < 0.2) - int(bb_position > 0.8),
+                np.where(ema_50 > ema_200, 1, -1)
+            ])
+            buy_count = int((scores > 0).sum())
+            sell_count = int((scores < 0).sum())
             
             if buy_count > sell_count:
                 analysis += f"\n\n🟢 **BUY** ({buy_count} vs {sell_count})"
@@ -233,21 +646,29 @@ class StockAnalyzer:
             logger.error(f"Analysis failed for {symbol}: {e}")
             return f"Error analyzing {symbol}"
 
+    @ttl_cache(ttl=60, maxsize=256)
+    def _fetch_news(self, symbol: str) -> List[Dict]:
+        """Raw yfinance news feed, shared by every limit for a minute; callers must not mutate it"""
+        return yf.Ticker(f"{symbol}.NS").news or []
+
     def get_stock_news(self, symbol: str, limit: int = 5) -> List[Dict]:
         """Get stock news"""
         try:
-            ticker = yf.Ticker(f"{symbol}.NS")
-            news = ticker.news or []
+            news = self._fetch_news(symbol)
+            
+            rows = [_news_row(item) for item in news[:limit]]
+            if not rows:
+                return []
             
-            processed_news = []
-            for item in news[:limit]:
-                processed_news.append({
-                    'title': item.get('title', ''),
-                    'publisher': item.get('publisher', ''),
-                    'published': datetime.fromtimestamp(item.get('providerPublishTime', 0)),
-                })
+            # One vectorized epoch -> naive IST datetime conversion. IST has no DST,
+            # so the fixed offset is exact for every item, unlike the server's local zone
+            ts = np.fromiter((row[2] or 0 for row in rows), dtype=np.int64, count=len(rows))
+            published = pd.to_datetime(ts + _IST_OFFSET, unit='s').to_pydatetime()
             
-            return processed_news
+            return [
+                {'title': title, 'publisher': publisher, 'published': when}
+                for (title, publisher, _), when in zip(rows, published)
+            ]
             
         except Exception as e:
             logger.error(f"News failed for {symbol}: {e}")
@@ -259,9 +680,5 @@ class StockAnalyzer:
         return price is not None
 
     def is_market_open(self) -> bool:
-        """Check if Indian market is open"""
-        now = datetime.now()
-        if now.weekday() >= 5:  # Weekend
-            return False
-        # Indian market: 9:15 AM - 3:30 PM
-        return 9 <= now.hour <= 15
\ No newline at end of file
+        """Check if Indian market is open (Mon-Fri, 9:15 AM - 3:30 PM IST)"""
+        return market_open_at(time.time())
\ No newline at end of file
@@ -1,24 +1,296 @@
 import asyncio
+import html
+from collections import defaultdict
+from itertools import islice
+from urllib.parse import urlparse
+from aiolimiter import AsyncLimiter
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ChatAction
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 import logging
-import re
-from typing import List, Dict
+import time
+import numpy as np
+from typing import Iterable, List, Dict, Optional, Tuple
 import config
 from sheets import GoogleSheetsManager
-from stocks import StockAnalyzer
-from ai_insights import AIInsightsManager
-from alerts import AlertManager
+from ai_insights import AIFailure, AIInsightsManager
+from alerts import PRIORITY_EMOJI, Alert, AlertManager, Priority
+from portfolio import compute_portfolio_stats, pnl_percent, to_float, watchlist_columns
 
 logger = logging.getLogger(__name__)
 
+# Only commands and button presses are handled; skip edits, channel posts, etc.
+_ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# Static replies, built once at import
+_WELCOME_MSG = """
+🤖 <b>Stock Watchlist AI Assistant</b>
+
+Welcome! I help you track stocks and provide AI-powered insights.
+
+<b>Available Commands:</b>
+• <code>/add_stock SYMBOL buy=XX target=YY stop=ZZ notes=TEXT</code> - Add stock to watchlist
+• <code>/remove_stock SYMBOL</code> - Remove stock from watchlist  
+• <code>/list</code> - Show your watchlist with current prices
+• <code>/news SYMBOL</code> - Get latest news for a stock
+• <code>/insights SYMBOL [SYMBOL ...]</code> - Get AI analysis and recommendations
+• <code>/alerts</code> - Show recent alerts
+• <code>/portfolio</code> - Portfolio overview and analysis
+
+<b>Example:</b>
+<code>/add_stock AAPL buy=150 target=180 stop=140 notes=Tech giant</code>
+
+Let's start building your watchlist! 📈
+"""
+
+_HELP_MSG = """
+📚 <b>Help - Stock Watchlist Commands</b>
+
+<b>Stock Management:</b>
+• <code>/add_stock SYMBOL buy=XX target=YY stop=ZZ notes=TEXT</code>
+  Example: <code>/add_stock TSLA buy=200 target=250 stop=180 notes=EV leader</code>
+
+• <code>/remove_stock SYMBOL</code>
+  Example: <code>/remove_stock TSLA</code>
+
+• <code>/list</code> - View all stocks in watchlist
+
+<b>Analysis &amp; Insights:</b>
+• <code>/news SYMBOL</code> - Latest news headlines
+• <code>/insights SYMBOL [SYMBOL ...]</code> - AI-powered analysis  
+• <code>/alerts</code> - Recent price and technical alerts
+• <code>/portfolio</code> - Portfolio performance overview
+
+<b>Interactive Features:</b>
+When you use <code>/list</code>, you'll see buttons for each stock:
+• 🔍 <b>Buy Advice</b> - AI recommendation for buying
+• 💰 <b>Sell Advice</b> - AI recommendation for selling  
+• 📰 <b>News</b> - Latest headlines
+• 📊 <b>Chart Analysis</b> - Technical indicators
+
+<b>Automated Features:</b>
+• Price updates every 5 minutes
+• Automatic alerts when targets/stop-losses hit
+• Technical analysis alerts (RSI, MACD, etc.)
+• AI insights combining news + technical data
+
+Need help? Just ask! 🚀
+"""
+
+_ADD_STOCK_USAGE = (
+    "❌ <b>Usage:</b> <code>/add_stock SYMBOL buy=XX target=YY stop=ZZ notes=TEXT</code>\n\n"
+    "<b>Example:</b> <code>/add_stock AAPL buy=150 target=180 stop=140 notes=Tech stock</code>"
+)
+_ADD_STOCK_MISSING = (
+    "❌ <b>Missing parameters!</b>\n\n"
+    "Required: <code>buy=XX target=YY stop=ZZ</code>\n"
+    "Example: <code>/add_stock AAPL buy=150 target=180 stop=140</code>"
+)
+_REMOVE_STOCK_USAGE = (
+    "❌ <b>Usage:</b> <code>/remove_stock SYMBOL</code>\n\n"
+    "<b>Example:</b> <code>/remove_stock AAPL</code>"
+)
+_EMPTY_WATCHLIST_MSG = (
+    "📋 <b>Your watchlist is empty</b>\n\n"
+    "Add stocks using: <code>/add_stock SYMBOL buy=XX target=YY stop=ZZ</code>"
+)
+_NEWS_USAGE = (
+    "❌ <b>Usage:</b> <code>/news SYMBOL</code>\n\n"
+    "<b>Example:</b> <code>/news AAPL</code>"
+)
+_INSIGHTS_USAGE = (
+    "❌ <b>Usage:</b> <code>/insights SYMBOL [SYMBOL ...]</code>\n\n"
+    "<b>Example:</b> <code>/insights AAPL</code> or <code>/insights TCS INFY</code>"
+)
+_INSIGHTS_TOO_MANY = (
+    f"❌ <b>Too many symbols</b> - /insights takes up to {config.MAX_INSIGHTS_SYMBOLS} at a time"
+)
+_NO_ALERTS_MSG = (
+    "📭 <b>No recent alerts</b>\n\n"
+    "I'll notify you when:\n"
+    "• Target prices are hit 🎯\n"
+    "• Stop losses are triggered 🛑\n"
+    "• Technical signals occur 📊\n"
+    "• Important news breaks 📰"
+)
+
+# Callback data of buttons sent before the one-letter codes, mapped onto them
+_LEGACY_CALLBACKS = {
+    "buy_advice": "b", "sell_advice": "s", "news": "n", "chart": "c", "sentiment": "z",
+    "portfolio_analysis": "p", "portfolio_ai_analysis": "p",
+}
+_OUTDATED_MENU_MSG = "This menu is outdated — send /list again"
+
+def _parse_callback_data(data: str) -> Tuple[str, str]:
+    """(code, argument) of a button, translating the long pre-"code|arg" format"""
+    if '|' in data:
+        action, _, arg = data.partition('|')
+        return action, arg
+    if data in _LEGACY_CALLBACKS:
+        return _LEGACY_CALLBACKS[data], ""
+    action, _, symbol = data.rpartition('_')
+    return _LEGACY_CALLBACKS.get(action, ""), symbol
+
+_MESSAGE_LIMIT = 4096  # Telegram rejects longer message texts
+_SECTION_SEP = "\n\n---\n\n"
+
+def _split_message(text: str, limit: int = _MESSAGE_LIMIT) -> List[str]:
+    """Pack ---separated sections into messages of at most `limit` characters"""
+    chunks = []
+    current = ""
+    for section in text.split(_SECTION_SEP):
+        # A single oversized section is cut on hard boundaries
+        pieces = [section[i:i + limit] for i in range(0, len(section), limit)] or [""]
+        for piece in pieces:
+            if current and len(current) + len(_SECTION_SEP) + len(piece) <= limit:
+                current += _SECTION_SEP + piece
+            else:
+                if current:
+                    chunks.append(current)
+                current = piece
+    chunks.append(current)
+    return chunks
+
+_ADD_STOCK_KEYS = frozenset(('buy', 'target', 'stop', 'notes'))
+
+def _parse_add_stock_args(tokens: Iterable[str]) -> Dict[str, str]:
+    """key=value parameters of /add_stock; bare words after notes= belong to the notes"""
+    params = {}
+    notes_parts = []
+    mode = None
+    for token in tokens:
+        key, sep, value = token.partition('=')
+        if sep and key in _ADD_STOCK_KEYS:
+            mode = key
+            if key == 'notes':
+                notes_parts = [value] if value else []
+            else:
+                params[key] = value
+        elif mode == 'notes':
+            notes_parts.append(token)
+    params['notes'] = ' '.join(notes_parts)
+    return params
+
+def _format_news(symbol: str, news_items: List[Dict], title_len: int = 100) -> str:
+    """Headline block shared by /news and the News button"""
+    parts = [f"📰 <b>Latest News for {html.escape(symbol)}</b>\n\n"]
+    for i, news in enumerate(news_items, 1):
+        published = news.get('published', '')
+        when = published.strftime('%m/%d %H:%M') if hasattr(published, 'strftime') else 'Recent'
+        title = html.escape(news.get('title', '')[:title_len])
+        parts.append(f"<b>{i}. {title}</b>\n📅 {when} | {html.escape(news.get('publisher', 'Unknown'))}\n\n")
+    return "".join(parts)
+
+def _render_watchlist_page(stocks: List[Dict], page: int) -> Tuple[str, InlineKeyboardMarkup]:
+    """/list text and keyboard for one page of config.WATCHLIST_PAGE_SIZE stocks"""
+    pages = -(-len(stocks) // config.WATCHLIST_PAGE_SIZE)
+    page = min(max(page, 0), pages - 1)
+    first = page * config.WATCHLIST_PAGE_SIZE
+    page_stocks = stocks[first:first + config.WATCHLIST_PAGE_SIZE]
+    
+    # Create message with this page's stocks
+    parts = ["📋 <b>Your Stock Watchlist</b>"]
+    if pages > 1:
+        parts.append(f" (page {page + 1}/{pages})")
+    parts.append("\n\n")
+    
+    # Parse the page into column arrays once, then derive every ratio vectorized
+    cols = watchlist_columns(page_stocks)
+    symbols, buy, current = cols['symbol'], cols['buy'], cols['current']
+    priced = current > 0
+    held = priced & (buy > 0)
+    pnls = np.where(held, (current - buy) / np.where(held, buy, 1.0) * 100, 0.0)  # Same as pnl_percent
+    safe_current = np.where(priced, current, 1.0)
+    target_distances = np.where(priced, (cols['target'] - current) / safe_current * 100, 0.0)
+    stop_distances = np.where(priced, (current - cols['stop']) / safe_current * 100, 0.0)
+    
+    rows = zip(symbols, current, cols['target'], cols['stop'], pnls, target_distances, stop_distances)
+    for i, (symbol, current_price, target_price, stop_loss, pnl, target_distance, stop_distance) in enumerate(rows, first + 1):
+        pnl_emoji = "🟢" if pnl >= 0 else "🔴"
+        
+        parts.append(
+            f"<b>{i}. {html.escape(str(symbol))}</b> {pnl_emoji}\n"
+            f"💰 Current: ₹{current_price:.2f} | P&amp;L: {pnl:+.1f}%\n"
+            f"🎯 Target: ₹{target_price:.2f} ({target_distance:+.1f}%)\n"
+            f"🛑 Stop: ₹{stop_loss:.2f} ({stop_distance:+.1f}%)\n\n"
+        )
+    message = "".join(parts)
+    
+    # Create inline keyboard for each stock
+    keyboard = []
+    for symbol in symbols:
+        row = [
+            InlineKeyboardButton(f"🔍 {symbol} Buy", callback_data=f"b|{symbol}"),
+            InlineKeyboardButton(f"💰 {symbol} Sell", callback_data=f"s|{symbol}"),
+        ]
+        keyboard.append(row)
+        
+        row2 = [
+            InlineKeyboardButton(f"📰 {symbol} News", callback_data=f"n|{symbol}"),
+            InlineKeyboardButton(f"📊 {symbol} Chart", callback_data=f"c|{symbol}"),
+        ]
+        keyboard.append(row2)
+    
+    # Page navigation, then the portfolio summary button
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"l|{page - 1}"))
+    if page < pages - 1:
+        nav.append(InlineKeyboardButton("➡️ Next", callback_data=f"l|{page + 1}"))
+    if nav:
+        keyboard.append(nav)
+    keyboard.append([InlineKeyboardButton("📊 Portfolio Analysis", callback_data="p|")])
+    
+    return message, InlineKeyboardMarkup(keyboard)
+
+class StreamingEditor:
+    """Accumulate streamed AI chunks and flush them into a Telegram message every few chunks"""
+
+    def __init__(self, edit, flush_every: int = config.STREAM_FLUSH_CHUNKS):
+        self.edit = edit
+        self.flush_every = flush_every
+        self.buffer = []
+
+    async def on_chunk(self, text: str):
+        """Awaited by AIInsightsManager for every streamed chunk"""
+        self.buffer.append(text)
+        if len(self.buffer) % self.flush_every == 0:
+            # Partial text may contain unbalanced Markdown, so send it as plain text
+            try:
+                await self.edit("".join(self.buffer))
+            except Exception as e:
+                logger.debug(f"Skipped streaming edit: {e}")
+
 class TelegramBot:
     def __init__(self):
         self.app = None
         self.sheets_manager = GoogleSheetsManager()
-        self.stock_analyzer = StockAnalyzer()
         self.ai_insights = AIInsightsManager()
+        self.stock_analyzer = self.ai_insights.stock_analyzer  # One price cache and session pool
         self.alert_manager = AlertManager()
+        # Stay just under Telegram's 30 msg/s global and 20 msg/min per-chat limits
+        self._global_limiter = AsyncLimiter(28, 1)
+        self._chat_limiters: Dict[str, AsyncLimiter] = defaultdict(lambda: AsyncLimiter(18, 60))
+        self._send_sem = asyncio.Semaphore(20)  # Bound on sends in flight at once
+        # (chat id, request key) -> (monotonic time, reply) for the expensive AI paths
+        self._cooldowns: Dict[Tuple[int, str], Tuple[float, str]] = {}
+        # Inline button action code -> (coroutine (query, symbol) returning the reply text,
+        # or (text, reply_markup), and its parse mode). AI and technical-analysis text is Markdown; our own templates are HTML.
+        # Buttons carry "<code>|<SYMBOL>" to keep keyboards well under the 64-byte limit
+        self._callback_handlers = {
+            "b": (lambda query, symbol: self._stream_ai(
+                query.edit_message_text, self.ai_insights.get_buy_sell_advice, symbol, "buy"), 'Markdown'),
+            "s": (lambda query, symbol: self._stream_ai(
+                query.edit_message_text, self.ai_insights.get_buy_sell_advice, symbol, "sell"), 'Markdown'),
+            "n": (self._news_callback, 'HTML'),
+            "c": (lambda query, symbol: asyncio.to_thread(
+                self.stock_analyzer.generate_technical_analysis, symbol), 'Markdown'),
+            "z": (lambda query, symbol: self._stream_ai(
+                query.edit_message_text, self.ai_insights.get_market_sentiment, symbol), 'Markdown'),
+            "p": (self._portfolio_callback, 'Markdown'),
+            "l": (self._watchlist_page_callback, 'HTML'),
+        }
         self.setup_bot()
 
     def setup_bot(self):
@@ -48,536 +320,447 @@ class TelegramBot:
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
-        welcome_message = """
-🤖 **Stock Watchlist AI Assistant**
-
-Welcome! I help you track stocks and provide AI-powered insights.
-
-**Available Commands:**
-• `/add_stock SYMBOL buy=XX target=YY stop=ZZ notes=TEXT` - Add stock to watchlist
-• `/remove_stock SYMBOL` - Remove stock from watchlist  
-• `/list` - Show your watchlist with current prices
-• `/news SYMBOL` - Get latest news for a stock
-• `/insights SYMBOL` - Get AI analysis and recommendations
-• `/alerts` - Show recent alerts
-• `/portfolio` - Portfolio overview and analysis
-
-**Example:**
-`/add_stock AAPL buy=150 target=180 stop=140 notes=Tech giant`
-
-Let's start building your watchlist! 📈
-        """
-        await update.message.reply_text(welcome_message, parse_mode='Markdown')
+        await self._reply(update, _WELCOME_MSG)
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
-        help_message = """
-📚 **Help - Stock Watchlist Commands**
-
-**Stock Management:**
-• `/add_stock SYMBOL buy=XX target=YY stop=ZZ notes=TEXT`
-  Example: `/add_stock TSLA buy=200 target=250 stop=180 notes=EV leader`
-
-• `/remove_stock SYMBOL`
-  Example: `/remove_stock TSLA`
-
-• `/list` - View all stocks in watchlist
-
-**Analysis & Insights:**
-• `/news SYMBOL` - Latest news headlines
-• `/insights SYMBOL` - AI-powered analysis  
-• `/alerts` - Recent price and technical alerts
-• `/portfolio` - Portfolio performance overview
-
-**Interactive Features:**
-When you use `/list`, you'll see buttons for each stock:
-• 🔍 **Buy Advice** - AI recommendation for buying
-• 💰 **Sell Advice** - AI recommendation for selling  
-• 📰 **News** - Latest headlines
-• 📊 **Chart Analysis** - Technical indicators
-
-**Automated Features:**
-• Price updates every 5 minutes
-• Automatic alerts when targets/stop-losses hit
-• Technical analysis alerts (RSI, MACD, etc.)
-• AI insights combining news + technical data
-
-Need help? Just ask! 🚀
-        """
-        await update.message.reply_text(help_message, parse_mode='Markdown')
+        await self._reply(update, _HELP_MSG)
 
     async def add_stock_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /add_stock command"""
         try:
             if not context.args:
-                await update.message.reply_text(
-                    "❌ **Usage:** `/add_stock SYMBOL buy=XX target=YY stop=ZZ notes=TEXT`\n\n"
-                    "**Example:** `/add_stock AAPL buy=150 target=180 stop=140 notes=Tech stock`",
-                    parse_mode='Markdown'
-                )
+                await self._reply(update, _ADD_STOCK_USAGE)
                 return
 
-            # Parse command arguments
-            args_text = ' '.join(context.args)
-            
             # Extract symbol (first argument)
             symbol = context.args[0].upper()
             
-            # Parse parameters using regex
-            buy_match = re.search(r'buy=([0-9.]+)', args_text)
-            target_match = re.search(r'target=([0-9.]+)', args_text)
-            stop_match = re.search(r'stop=([0-9.]+)', args_text)
-            notes_match = re.search(r'notes=(.+?)(?:\s+(?:buy|target|stop)=|$)', args_text)
-            
-            if not all([buy_match, target_match, stop_match]):
-                await update.message.reply_text(
-                    "❌ **Missing parameters!**\n\n"
-                    "Required: `buy=XX target=YY stop=ZZ`\n"
-                    "Example: `/add_stock AAPL buy=150 target=180 stop=140`",
-                    parse_mode='Markdown'
-                )
+            # Parse key=value parameters token by token
+            params = _parse_add_stock_args(islice(context.args, 1, None))
+            
+            if not all(params.get(key) for key in ('buy', 'target', 'stop')):
+                await self._reply(update, _ADD_STOCK_MISSING)
                 return
             
-            buy_price = float(buy_match.group(1))
-            target_price = float(target_match.group(1))
-            stop_loss = float(stop_match.group(1))
-            notes = notes_match.group(1).strip() if notes_match else ""
+            buy_price = float(params['buy'])
+            target_price = float(params['target'])
+            stop_loss = float(params['stop'])
+            notes = params['notes']
+            
+            # The watchlist lookup is usually served from the sheet cache; check it
+            # before paying for a price lookup to validate the symbol
+            existing = await asyncio.to_thread(self.sheets_manager.get_stock_by_symbol, symbol)
+            if existing:
+                await self._reply(update, f"ℹ️ <b>{html.escape(symbol)} is already in your watchlist</b> - use <code>/remove_stock {html.escape(symbol)}</code> first to change it")
+                return
             
             # Validate symbol
-            if not self.stock_analyzer.validate_symbol(symbol):
-                await update.message.reply_text(f"❌ **Invalid stock symbol:** {symbol}")
+            valid, _ = await asyncio.gather(
+                asyncio.to_thread(self.stock_analyzer.validate_symbol, symbol),
+                self._typing(update, context)
+            )
+            if not valid:
+                await self._reply(update, f"❌ <b>Invalid stock symbol:</b> {html.escape(symbol)}")
                 return
             
             # Validate price logic
             if target_price <= buy_price:
-                await update.message.reply_text("❌ **Target price must be higher than buy price**")
+                await self._reply(update, "❌ <b>Target price must be higher than buy price</b>")
                 return
             
             if stop_loss >= buy_price:
-                await update.message.reply_text("❌ **Stop loss must be lower than buy price**")
+                await self._reply(update, "❌ <b>Stop loss must be lower than buy price</b>")
                 return
             
+            # Current price is already cached by validate_symbol; write it with the row
+            current_price = await asyncio.to_thread(self.stock_analyzer.get_stock_price, symbol) or 0
+            
             # Add to Google Sheets
-            success = self.sheets_manager.add_stock(symbol, buy_price, target_price, stop_loss, notes)
+            success = await asyncio.to_thread(
+                self.sheets_manager.add_stock, symbol, buy_price, target_price, stop_loss, notes, current_price
+            )
             
             if success:
-                # Get current price
-                current_price = self.stock_analyzer.get_stock_price(symbol)
-                if current_price:
-                    self.sheets_manager.update_current_price(symbol, current_price)
-                
-                await update.message.reply_text(
-                    f"✅ **Added {symbol} to watchlist!**\n\n"
-                    f"📊 **Details:**\n"
+                await self._reply(
+                    update,
+                    f"✅ <b>Added {html.escape(symbol)} to watchlist!</b>\n\n"
+                    f"📊 <b>Details:</b>\n"
                     f"• Buy Price: ₹{buy_price:.2f}\n"
                     f"• Target: ₹{target_price:.2f}\n"
                     f"• Stop Loss: ₹{stop_loss:.2f}\n"
                     f"• Current Price: ₹{current_price:.2f}\n"
-                    f"• Notes: {notes}\n\n"
-                    f"🤖 I'll monitor this stock and send alerts!",
-                    parse_mode='Markdown'
+                    f"• Notes: {html.escape(notes)}\n\n"
+                    f"🤖 I'll monitor this stock and send alerts!"
                 )
             else:
-                await update.message.reply_text(f"❌ **Failed to add {symbol}** - Please try again")
+                await self._reply(update, f"❌ <b>Failed to add {html.escape(symbol)}</b> - Please try again")
                 
         except ValueError:
-            await update.message.reply_text("❌ **Invalid price format!** Use numbers only (e.g., 150.50)")
+            await self._reply(update, "❌ <b>Invalid price format!</b> Use numbers only (e.g., 150.50)")
         except Exception as e:
             logger.error(f"Failed to add stock: {e}")
-            await update.message.reply_text(f"❌ **Error adding stock:** {str(e)}")
+            await self._reply(update, f"❌ <b>Error adding stock:</b> {html.escape(str(e))}")
 
     async def remove_stock_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /remove_stock command"""
         try:
             if not context.args:
-                await update.message.reply_text(
-                    "❌ **Usage:** `/remove_stock SYMBOL`\n\n"
-                    "**Example:** `/remove_stock AAPL`",
-                    parse_mode='Markdown'
-                )
+                await self._reply(update, _REMOVE_STOCK_USAGE)
                 return
             
             symbol = context.args[0].upper()
             
             # Check if stock exists
-            stock_data = self.sheets_manager.get_stock_by_symbol(symbol)
+            stock_data = await asyncio.to_thread(self.sheets_manager.get_stock_by_symbol, symbol)
             if not stock_data:
-                await update.message.reply_text(f"❌ **{symbol} not found** in your watchlist")
+                await self._reply(update, f"❌ <b>{html.escape(symbol)} not found</b> in your watchlist")
                 return
             
             # Remove from sheets
-            success = self.sheets_manager.remove_stock(symbol)
+            success = await asyncio.to_thread(self.sheets_manager.remove_stock, symbol)
             
             if success:
-                await update.message.reply_text(
-                    f"✅ **Removed {symbol}** from watchlist\n\n"
-                    f"📊 **Removed stock details:**\n"
+                final_pnl = pnl_percent(to_float(stock_data.get('Buy Price', 0)),
+                                        to_float(stock_data.get('Current Price', 0)))
+                await self._reply(
+                    update,
+                    f"✅ <b>Removed {html.escape(symbol)}</b> from watchlist\n\n"
+                    f"📊 <b>Removed stock details:</b>\n"
                     f"• Buy Price: ₹{stock_data.get('Buy Price', 0)}\n"
                     f"• Current Price: ₹{stock_data.get('Current Price', 0)}\n"
-                    f"• Final P&L: {self._calculate_pnl(stock_data):.1f}%",
-                    parse_mode='Markdown'
+                    f"• Final P&amp;L: {final_pnl:.1f}%"
                 )
             else:
-                await update.message.reply_text(f"❌ **Failed to remove {symbol}** - Please try again")
+                await self._reply(update, f"❌ <b>Failed to remove {html.escape(symbol)}</b> - Please try again")
                 
         except Exception as e:
             logger.error(f"Failed to remove stock: {e}")
-            await update.message.reply_text(f"❌ **Error:** {str(e)}")
+            await self._reply(update, f"❌ <b>Error:</b> {html.escape(str(e))}")
 
     async def list_stocks_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /list command with inline buttons"""
         try:
-            stocks = self.sheets_manager.get_all_stocks()
+            stocks = await self.sheets_manager.get_all_stocks_async()
             
             if not stocks:
-                await update.message.reply_text(
-                    "📋 **Your watchlist is empty**\n\n"
-                    "Add stocks using: `/add_stock SYMBOL buy=XX target=YY stop=ZZ`",
-                    parse_mode='Markdown'
-                )
+                await self._reply(update, _EMPTY_WATCHLIST_MSG)
                 return
             
-            # Create message with stock list
-            message = "📋 **Your Stock Watchlist**\n\n"
+            message, reply_markup = _render_watchlist_page(stocks, 0)
             
-            for i, stock in enumerate(stocks, 1):
-                symbol = stock.get('Stock Symbol', '')
-                buy_price = float(stock.get('Buy Price', 0))
-                current_price = float(stock.get('Current Price', 0))
-                target_price = float(stock.get('Target Price', 0))
-                stop_loss = float(stock.get('Stop Loss', 0))
-                
-                pnl = self._calculate_pnl(stock)
-                pnl_emoji = "🟢" if pnl >= 0 else "🔴"
-                
-                # Distance to target and stop loss
-                target_distance = ((target_price - current_price) / current_price) * 100 if current_price > 0 else 0
-                stop_distance = ((current_price - stop_loss) / current_price) * 100 if current_price > 0 else 0
-                
-                message += f"**{i}. {symbol}** {pnl_emoji}\n"
-                message += f"💰 Current: ₹{current_price:.2f} | P&L: {pnl:+.1f}%\n"
-                message += f"🎯 Target: ₹{target_price:.2f} ({target_distance:+.1f}%)\n"
-                message += f"🛑 Stop: ₹{stop_loss:.2f} ({stop_distance:+.1f}%)\n\n"
-            
-            # Create inline keyboard for each stock
-            keyboard = []
-            for stock in stocks:
-                symbol = stock.get('Stock Symbol', '')
-                row = [
-                    InlineKeyboardButton(f"🔍 {symbol} Buy", callback_data=f"buy_advice_{symbol}"),
-                    InlineKeyboardButton(f"💰 {symbol} Sell", callback_data=f"sell_advice_{symbol}"),
-                ]
-                keyboard.append(row)
-                
-                row2 = [
-                    InlineKeyboardButton(f"📰 {symbol} News", callback_data=f"news_{symbol}"),
-                    InlineKeyboardButton(f"📊 {symbol} Chart", callback_data=f"chart_{symbol}"),
-                ]
-                keyboard.append(row2)
-            
-            # Add portfolio summary button
-            keyboard.append([InlineKeyboardButton("📊 Portfolio Analysis", callback_data="portfolio_analysis")])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await update.message.reply_text(
+            await self._reply(
+                update,
                 message, 
-                parse_mode='Markdown',
                 reply_markup=reply_markup
             )
             
         except Exception as e:
             logger.error(f"Failed to list stocks: {e}")
-            await update.message.reply_text(f"❌ **Error:** {str(e)}")
+            await self._reply(update, f"❌ <b>Error:</b> {html.escape(str(e))}")
 
     async def news_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /news command"""
         try:
             if not context.args:
-                await update.message.reply_text(
-                    "❌ **Usage:** `/news SYMBOL`\n\n"
-                    "**Example:** `/news AAPL`",
-                    parse_mode='Markdown'
-                )
+                await self._reply(update, _NEWS_USAGE)
                 return
             
             symbol = context.args[0].upper()
             
             # Get news
-            news_items = self.stock_analyzer.get_stock_news(symbol, limit=5)
+            news_items, _ = await asyncio.gather(
+                asyncio.to_thread(self.stock_analyzer.get_stock_news, symbol, 5),
+                self._typing(update, context)
+            )
             
             if not news_items:
-                await update.message.reply_text(f"📰 **No recent news found for {symbol}**")
+                await self._reply(update, f"📰 <b>No recent news found for {html.escape(symbol)}</b>")
                 return
             
-            message = f"📰 **Latest News for {symbol}**\n\n"
-            
-            for i, news in enumerate(news_items, 1):
-                title = news.get('title', '')[:100]
-                publisher = news.get('publisher', 'Unknown')
-                published = news.get('published', '')
-                
-                message += f"**{i}. {title}**\n"
-                message += f"📅 {published.strftime('%m/%d %H:%M') if hasattr(published, 'strftime') else 'Recent'} | {publisher}\n\n"
+            message = _format_news(symbol, news_items)
             
             # Add sentiment analysis button
-            keyboard = [[InlineKeyboardButton(f"🤖 AI Sentiment Analysis", callback_data=f"sentiment_{symbol}")]]
+            keyboard = [[InlineKeyboardButton(f"🤖 AI Sentiment Analysis", callback_data=f"z|{symbol}")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await update.message.reply_text(
+            await self._reply(
+                update,
                 message, 
-                parse_mode='Markdown',
                 reply_markup=reply_markup
             )
             
         except Exception as e:
             logger.error(f"Failed to get news: {e}")
-            await update.message.reply_text(f"❌ **Error:** {str(e)}")
+            await self._reply(update, f"❌ <b>Error:</b> {html.escape(str(e))}")
 
     async def insights_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /insights command"""
         try:
             if not context.args:
-                await update.message.reply_text(
-                    "❌ **Usage:** `/insights SYMBOL`\n\n"
-                    "**Example:** `/insights AAPL`",
-                    parse_mode='Markdown'
+                await self._reply(update, _INSIGHTS_USAGE)
+                return
+            
+            symbols = list(dict.fromkeys(arg.upper() for arg in context.args))
+            if len(symbols) > config.MAX_INSIGHTS_SYMBOLS:
+                await self._reply(update, _INSIGHTS_TOO_MANY)
+                return
+            cooldown_key = (update.effective_chat.id, "insights|" + " ".join(symbols))
+            recent = self._recent_reply(cooldown_key)
+            if recent is not None:
+                for chunk in _split_message(recent):
+                    await update.message.reply_text(chunk, parse_mode='Markdown')
+                return
+            
+            if len(symbols) > 1:
+                # Several symbols: one batched Gemini call instead of one per stock
+                loading_msg = await self._reply(
+                    update,
+                    f"🤖 <b>Analyzing {html.escape(', '.join(symbols))}</b>...\nGenerating AI insights..."
                 )
+                batch = await self.ai_insights.batch_insights(symbols)
+                full_message = _SECTION_SEP.join(batch.values())
+                await self._edit_long(update, loading_msg, full_message)
+                if not any(isinstance(insight, AIFailure) for insight in batch.values()):
+                    self._remember_reply(cooldown_key, full_message)
                 return
             
-            symbol = context.args[0].upper()
+            symbol = symbols[0]
             
             # Show loading message
-            loading_msg = await update.message.reply_text(f"🤖 **Analyzing {symbol}**...\nGenerating AI insights...")
-            
-            # Get AI insights
-            ai_insight = self.ai_insights.generate_stock_insight(symbol)
+            loading_msg = await self._reply(update, f"🤖 <b>Analyzing {html.escape(symbol)}</b>...\nGenerating AI insights...")
             
-            # Get technical analysis
-            tech_analysis = self.stock_analyzer.generate_technical_analysis(symbol)
+            # AI insights (streamed into the loading message) and technical analysis run concurrently
+            ai_insight, tech_analysis = await asyncio.gather(
+                self._stream_ai(loading_msg.edit_text, self.ai_insights.generate_stock_insight, symbol),
+                asyncio.to_thread(self.stock_analyzer.generate_technical_analysis, symbol)
+            )
             
             # Combine insights
-            full_message = f"{ai_insight}\n\n---\n\n{tech_analysis}"
+            full_message = f"{ai_insight}{_SECTION_SEP}{tech_analysis}"
             
-            # Delete loading message and send results
-            await loading_msg.delete()
-            await update.message.reply_text(full_message, parse_mode='Markdown')
+            # Replace the streamed text with the formatted results
+            await self._edit_long(update, loading_msg, full_message)
+            if not isinstance(ai_insight, AIFailure):
+                self._remember_reply(cooldown_key, full_message)
             
         except Exception as e:
             logger.error(f"Failed to get insights: {e}")
-            await update.message.reply_text(f"❌ **Error:** {str(e)}")
+            await self._reply(update, f"❌ <b>Error:</b> {html.escape(str(e))}")
 
     async def alerts_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /alerts command"""
         try:
             # Get recent alerts from alert manager history
-            recent_alerts = self.alert_manager.alert_history[-10:]  # Last 10 alerts
+            # Last 10 alerts, newest first, read straight off the tail of the deque
+            recent_alerts = list(islice(reversed(self.alert_manager.alert_history), 10))
             
             if not recent_alerts:
-                await update.message.reply_text(
-                    "📭 **No recent alerts**\n\n"
-                    "I'll notify you when:\n"
-                    "• Target prices are hit 🎯\n"
-                    "• Stop losses are triggered 🛑\n"
-                    "• Technical signals occur 📊\n"
-                    "• Important news breaks 📰",
-                    parse_mode='Markdown'
-                )
+                await self._reply(update, _NO_ALERTS_MSG)
                 return
             
-            message = "🔔 **Recent Alerts**\n\n"
+            parts = ["🔔 <b>Recent Alerts</b>\n\n"]
             
-            for alert in reversed(recent_alerts):  # Show newest first
-                timestamp = alert['timestamp'].strftime("%m/%d %H:%M")
-                symbol = alert.get('symbol', 'Unknown')
-                alert_type = alert.get('type', '').replace('_', ' ').title()
-                priority = alert.get('priority', 'LOW')
+            for alert in recent_alerts:
+                timestamp = alert.timestamp.strftime("%m/%d %H:%M")
+                symbol = alert.symbol or 'Unknown'
+                alert_type = alert.label
+                emoji = PRIORITY_EMOJI[alert.priority]
                 
-                priority_emoji = {'CRITICAL': '🚨', 'HIGH': '❗', 'MEDIUM': '⚠️', 'LOW': 'ℹ️'}
-                emoji = priority_emoji.get(priority, 'ℹ️')
-                
-                message += f"{emoji} **{symbol}** - {alert_type}\n"
-                message += f"📅 {timestamp}\n\n"
+                parts.append(f"{emoji} <b>{html.escape(str(symbol))}</b> - {alert_type}\n📅 {timestamp}\n\n")
+            message = "".join(parts)
             
-            await update.message.reply_text(message, parse_mode='Markdown')
+            await self._reply(update, message)
             
         except Exception as e:
             logger.error(f"Failed to show alerts: {e}")
-            await update.message.reply_text(f"❌ **Error:** {str(e)}")
+            await self._reply(update, f"❌ <b>Error:</b> {html.escape(str(e))}")
 
     async def portfolio_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /portfolio command"""
         try:
-            stocks = self.sheets_manager.get_all_stocks()
+            stocks = await self.sheets_manager.get_all_stocks_async()
             
             if not stocks:
-                await update.message.reply_text("📋 **Portfolio is empty** - Add some stocks first!")
+                await self._reply(update, "📋 <b>Portfolio is empty</b> - Add some stocks first!")
                 return
             
-            # Calculate portfolio metrics
-            total_positions = len(stocks)
-            profitable = 0
-            total_pnl = 0
-            best_performer = None
-            worst_performer = None
-            best_pnl = float('-inf')
-            worst_pnl = float('inf')
-            
-            message = f"📊 **Portfolio Overview**\n"
-            message += f"📈 **Total Positions:** {total_positions}\n\n"
-            
-            for stock in stocks:
-                pnl = self._calculate_pnl(stock)
-                total_pnl += pnl
-                
-                if pnl > 0:
-                    profitable += 1
-                
-                if pnl > best_pnl:
-                    best_pnl = pnl
-                    best_performer = stock.get('Stock Symbol', '')
-                
-                if pnl < worst_pnl:
-                    worst_pnl = pnl
-                    worst_performer = stock.get('Stock Symbol', '')
+            # Calculate portfolio metrics in one vectorized pass (same helper as the daily summary)
+            stats = compute_portfolio_stats(stocks)
+            total_positions = stats.total_positions
+            profitable = stats.winners
+            avg_pnl = stats.avg_pnl
+            win_rate = stats.win_rate
+            
+            if stats.symbols:
+                best, worst = int(stats.pnls.argmax()), int(stats.pnls.argmin())
+                best_performer, best_pnl = html.escape(str(stats.symbols[best])), float(stats.pnls[best])
+                worst_performer, worst_pnl = html.escape(str(stats.symbols[worst])), float(stats.pnls[worst])
+            else:
+                best_performer = worst_performer = "N/A"
+                best_pnl = worst_pnl = 0.0
             
-            avg_pnl = total_pnl / total_positions if total_positions > 0 else 0
-            win_rate = (profitable / total_positions) * 100 if total_positions > 0 else 0
+            parts = [f"📊 <b>Portfolio Overview</b>\n📈 <b>Total Positions:</b> {total_positions}\n\n"]
             
             # Performance metrics
-            message += f"📊 **Performance:**\n"
-            message += f"• Average P&L: {avg_pnl:+.1f}%\n"
-            message += f"• Win Rate: {win_rate:.1f}% ({profitable}/{total_positions})\n"
-            message += f"• Best: {best_performer} ({best_pnl:+.1f}%)\n"
-            message += f"• Worst: {worst_performer} ({worst_pnl:+.1f}%)\n\n"
+            parts.append(
+                f"📊 <b>Performance:</b>\n"
+                f"• Average P&amp;L: {avg_pnl:+.1f}%\n"
+                f"• Win Rate: {win_rate:.1f}% ({profitable}/{total_positions})\n"
+                f"• Best: {best_performer} ({best_pnl:+.1f}%)\n"
+                f"• Worst: {worst_performer} ({worst_pnl:+.1f}%)\n\n"
+            )
             
             # Risk analysis
-            message += f"⚖️ **Risk Analysis:**\n"
+            parts.append("⚖️ <b>Risk Analysis:</b>\n")
             if avg_pnl < -5:
-                message += f"🔴 High portfolio risk - Average loss {avg_pnl:.1f}%\n"
+                parts.append(f"🔴 High portfolio risk - Average loss {avg_pnl:.1f}%\n")
             elif avg_pnl > 5:
-                message += f"🟢 Strong performance - Average gain {avg_pnl:.1f}%\n"
+                parts.append(f"🟢 Strong performance - Average gain {avg_pnl:.1f}%\n")
             else:
-                message += f"🟡 Neutral performance - Average {avg_pnl:+.1f}%\n"
+                parts.append(f"🟡 Neutral performance - Average {avg_pnl:+.1f}%\n")
             
             if win_rate < 40:
-                message += f"⚠️ Low win rate - Review strategy\n"
+                parts.append("⚠️ Low win rate - Review strategy\n")
             elif win_rate > 60:
-                message += f"✅ Good win rate - Strategy working\n"
+                parts.append("✅ Good win rate - Strategy working\n")
+            message = "".join(parts)
             
             # Add AI analysis button
-            keyboard = [[InlineKeyboardButton("🤖 AI Portfolio Analysis", callback_data="portfolio_ai_analysis")]]
+            keyboard = [[InlineKeyboardButton("🤖 AI Portfolio Analysis", callback_data="p|")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await update.message.reply_text(
+            await self._reply(
+                update,
                 message, 
-                parse_mode='Markdown',
                 reply_markup=reply_markup
             )
             
         except Exception as e:
             logger.error(f"Failed to show portfolio: {e}")
-            await update.message.reply_text(f"❌ **Error:** {str(e)}")
+            await self._reply(update, f"❌ <b>Error:</b> {html.escape(str(e))}")
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle inline button callbacks"""
         try:
             query = update.callback_query
+            action, symbol = _parse_callback_data(query.data)
+            entry = self._callback_handlers.get(action)
+            if entry is None:
+                logger.warning(f"Unknown callback data: {query.data}")
+                await query.answer(_OUTDATED_MENU_MSG)
+                return
             await query.answer()
             
-            callback_data = query.data
-            
-            if callback_data.startswith("buy_advice_"):
-                symbol = callback_data.replace("buy_advice_", "")
-                advice = self.ai_insights.get_buy_sell_advice(symbol, "buy")
-                await query.edit_message_text(advice, parse_mode='Markdown')
-                
-            elif callback_data.startswith("sell_advice_"):
-                symbol = callback_data.replace("sell_advice_", "")
-                advice = self.ai_insights.get_buy_sell_advice(symbol, "sell")
-                await query.edit_message_text(advice, parse_mode='Markdown')
-                
-            elif callback_data.startswith("news_"):
-                symbol = callback_data.replace("news_", "")
-                news_items = self.stock_analyzer.get_stock_news(symbol, limit=3)
-                
-                if news_items:
-                    message = f"📰 **Latest News for {symbol}**\n\n"
-                    for i, news in enumerate(news_items, 1):
-                        title = news.get('title', '')[:80]
-                        publisher = news.get('publisher', 'Unknown')
-                        message += f"**{i}. {title}**\n📅 {publisher}\n\n"
-                else:
-                    message = f"📰 **No recent news for {symbol}**"
-                
-                await query.edit_message_text(message, parse_mode='Markdown')
-                
-            elif callback_data.startswith("chart_"):
-                symbol = callback_data.replace("chart_", "")
-                analysis = self.stock_analyzer.generate_technical_analysis(symbol)
-                await query.edit_message_text(analysis, parse_mode='Markdown')
-                
-            elif callback_data.startswith("sentiment_"):
-                symbol = callback_data.replace("sentiment_", "")
-                sentiment = self.ai_insights.get_market_sentiment(symbol)
-                await query.edit_message_text(sentiment, parse_mode='Markdown')
-                
-            elif callback_data == "portfolio_analysis":
-                stocks = self.sheets_manager.get_all_stocks()
-                analysis = self.ai_insights.analyze_portfolio(stocks)
-                await query.edit_message_text(analysis, parse_mode='Markdown')
-                
-            elif callback_data == "portfolio_ai_analysis":
-                stocks = self.sheets_manager.get_all_stocks()
-                analysis = self.ai_insights.analyze_portfolio(stocks)
-                await query.edit_message_text(analysis, parse_mode='Markdown')
+            handler, parse_mode = entry
+            # Buy/sell advice taps are LLM calls; repeated taps (old buttons included) reuse the last answer
+            cooldown_key = (update.effective_chat.id, f"{action}|{symbol}") if action in ("b", "s") else None
+            message = self._recent_reply(cooldown_key) if cooldown_key else None
+            if message is None:
+                message = await handler(query, symbol)
+                if cooldown_key and not isinstance(message, AIFailure):
+                    self._remember_reply(cooldown_key, message)
+            if isinstance(message, tuple):  # (text, reply_markup)
+                message, reply_markup = message
+                await query.edit_message_text(message, parse_mode=parse_mode, reply_markup=reply_markup)
+            else:
+                await query.edit_message_text(message, parse_mode=parse_mode)
                 
         except Exception as e:
             logger.error(f"Failed to handle callback: {e}")
-            await query.edit_message_text(f"❌ **Error:** {str(e)}")
+            await query.edit_message_text(f"❌ <b>Error:</b> {html.escape(str(e))}", parse_mode='HTML')
+
+    async def _news_callback(self, query, symbol: str) -> str:
+        """Headlines for the News button"""
+        news_items = await asyncio.to_thread(self.stock_analyzer.get_stock_news, symbol, 3)
+        
+        if not news_items:
+            return f"📰 <b>No recent news for {html.escape(symbol)}</b>"
+        
+        return _format_news(symbol, news_items, title_len=80)
+
+    async def _watchlist_page_callback(self, query, page: str) -> Tuple[str, InlineKeyboardMarkup]:
+        """Another /list page for the Prev/Next buttons"""
+        stocks = await self.sheets_manager.get_all_stocks_async()
+        if not stocks:
+            return _EMPTY_WATCHLIST_MSG, None
+        return _render_watchlist_page(stocks, int(page))
+
+    async def _portfolio_callback(self, query, symbol: str) -> str:
+        """AI portfolio analysis for the Portfolio buttons"""
+        stocks = await self.sheets_manager.get_all_stocks_async()
+        return await self._stream_ai(query.edit_message_text, self.ai_insights.analyze_portfolio, stocks)
 
-    def _calculate_pnl(self, stock_data: Dict) -> float:
-        """Calculate P&L percentage for a stock"""
+    def _recent_reply(self, key: Tuple[int, str]) -> Optional[str]:
+        """Reply stored for key within the last INSIGHTS_COOLDOWN_SECONDS, else None"""
+        entry = self._cooldowns.get(key)
+        if entry and time.monotonic() - entry[0] < config.INSIGHTS_COOLDOWN_SECONDS:
+            return entry[1]
+        return None
+
+    def _remember_reply(self, key: Tuple[int, str], text: str):
+        """Store a successful reply for the cooldown window, dropping expired entries as we go"""
+        now = time.monotonic()
+        if len(self._cooldowns) >= 256:
+            for stale in [k for k, (ts, _) in self._cooldowns.items() if now - ts >= config.INSIGHTS_COOLDOWN_SECONDS]:
+                del self._cooldowns[stale]
+        self._cooldowns[key] = (now, text)
+
+    async def _typing(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show the native "typing..." indicator; cleared by Telegram when our reply lands"""
         try:
-            buy_price = float(stock_data.get('Buy Price', 0))
-            current_price = float(stock_data.get('Current Price', 0))
-            
-            if buy_price > 0 and current_price > 0:
-                return ((current_price - buy_price) / buy_price) * 100
-            return 0
-        except:
-            return 0
+            await context.bot.send_chat_action(update.effective_chat.id, ChatAction.TYPING)
+        except Exception as e:
+            logger.debug(f"Chat action failed: {e}")
+
+    async def _reply(self, update: Update, text: str, **kwargs):
+        """Reply with one of this module's HTML templates (user text must be html.escape'd)"""
+        return await update.message.reply_text(text, parse_mode='HTML', **kwargs)
+
+    async def _edit_long(self, update: Update, message, text: str):
+        """Put Markdown `text` into `message`, continuing in new messages past Telegram's limit"""
+        first, *rest = _split_message(text)
+        await message.edit_text(first, parse_mode='Markdown')
+        for chunk in rest:
+            await update.message.reply_text(chunk, parse_mode='Markdown')
+
+    async def _stream_ai(self, edit, generate, *args) -> str:
+        """Await an AIInsightsManager coroutine, streaming chunks into `edit`"""
+        editor = StreamingEditor(edit)
+        return await generate(*args, on_chunk=editor.on_chunk)
 
     async def send_alert(self, chat_id: str, message: str):
         """Send alert message to Telegram"""
         try:
-            await self.app.bot.send_message(chat_id=chat_id, text=message, parse_mode='Markdown')
+            async with self._send_sem, self._global_limiter, self._chat_limiters[chat_id]:
+                try:
+                    await self.app.bot.send_message(chat_id=chat_id, text=message, parse_mode='Markdown')
+                except RetryAfter as e:
+                    logger.warning(f"Telegram flood control, retrying in {e.retry_after}s")
+                    await asyncio.sleep(e.retry_after)
+                    await self.app.bot.send_message(chat_id=chat_id, text=message, parse_mode='Markdown')
             logger.info(f"Alert sent to {chat_id}")
         except Exception as e:
             logger.error(f"Failed to send alert: {e}")
 
-    async def send_bulk_alerts(self, alerts: List[Dict]):
+    async def send_bulk_alerts(self, alerts: List[Alert]):
         """Send multiple alerts efficiently"""
         if not alerts or not config.CHAT_ID:
             return
         
         try:
             # Group alerts by priority
-            critical_alerts = [a for a in alerts if a.get('priority') == 'CRITICAL']
-            high_alerts = [a for a in alerts if a.get('priority') == 'HIGH']
-            other_alerts = [a for a in alerts if a.get('priority') not in ['CRITICAL', 'HIGH']]
-            
-            # Send critical alerts immediately
-            for alert in critical_alerts:
-                message = self.alert_manager.format_alert_message(alert)
-                await self.send_alert(config.CHAT_ID, message)
-                await asyncio.sleep(1)  # Rate limiting
-            
-            # Send high priority alerts
-            for alert in high_alerts:
-                message = self.alert_manager.format_alert_message(alert)
-                await self.send_alert(config.CHAT_ID, message)
-                await asyncio.sleep(1)
+            critical_alerts = [a for a in alerts if a.priority is Priority.CRITICAL]
+            high_alerts = [a for a in alerts if a.priority is Priority.HIGH]
+            other_alerts = [a for a in alerts if a.priority < Priority.HIGH]
+            
+            # Send critical and high priority alerts concurrently, critical ones queued
+            # first (send_alert applies the rate limits)
+            await asyncio.gather(
+                *(self.send_alert(config.CHAT_ID, self.alert_manager.format_alert_message(alert))
+                  for alert in critical_alerts + high_alerts),
+                return_exceptions=True
+            )
             
             # Send summary for other alerts if any
             if other_alerts:
@@ -594,23 +777,36 @@ Need help? Just ask! 🚀
             
             # Simple polling without event loop complications
             self.app.run_polling(
-                drop_pending_updates=True
+                drop_pending_updates=True,
+                allowed_updates=_ALLOWED_UPDATES
             )
             
         except Exception as e:
             logger.error(f"Failed to start bot polling: {e}")
             raise
 
-    async def start_webhook(self, webhook_url: str, port: int = 8080):
+    def start_webhook(self, webhook_url: str, port: int = 8080, secret_token: Optional[str] = None):
         """Start webhook for production deployment"""
         try:
-            await self.app.bot.set_webhook(url=webhook_url)
+            logger.info(f"Starting Telegram bot webhook at {webhook_url} (port {port})...")
+            
+            # run_webhook registers the webhook (with allowed_updates) and blocks like run_polling
             self.app.run_webhook(
                 listen="0.0.0.0",
                 port=port,
-                webhook_url=webhook_url
+                url_path=urlparse(webhook_url).path.lstrip('/'),  # Serve where Telegram will POST
+                webhook_url=webhook_url,
+                secret_token=secret_token,
+                drop_pending_updates=True,
+                allowed_updates=_ALLOWED_UPDATES
             )
-            logger.info(f"Webhook started at {webhook_url}")
         except Exception as e:
             logger.error(f"Failed to start webhook: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def run(self):
+        """Serve updates via webhook when WEBHOOK_URL is configured, else long polling"""
+        if config.WEBHOOK_URL:
+            self.start_webhook(config.WEBHOOK_URL, config.WEBHOOK_PORT, config.WEBHOOK_SECRET)
+        else:
+            self.start_polling()
\ No newline at end of file